@@ -2,16 +2,17 @@ import pygame
 import pymunk
 import pymunk.pygame_util
 import threading
+import os
 import time 
 import random
 
-# Initialize Pygame
-pygame.init()
+from engine import startup
+from engine.loop import FixedTimestep, InterpolatedBodies
+from engine.profiler import FrameProfiler
+from engine.text import TextLabel, TextRenderer
 
 # Screen setup
 screen_width, screen_height = 800, 600
-screen = pygame.display.set_mode((screen_width, screen_height))
-pygame.display.set_caption("Doging Rally")
 
 # Colors
 WHITE = (255, 255, 255)
@@ -20,12 +21,20 @@ BLUE = (0, 0, 255)
 RED = (255, 0, 0)
 BLACK = (0, 0, 0)
 
-# Initialize Pymunk space
-space = pymunk.Space()
-space.gravity = (0, 0)  # No gravity for this 2D plane
+# Text rendering with cached fonts and surfaces
+text_renderer = TextRenderer()
 
-# Pymunk helper for drawing
-draw_options = pymunk.pygame_util.DrawOptions(screen)
+# Frame profiler: set PROFILE=1 or press F3 in game, F4 exports a trace
+profiler = FrameProfiler(enabled=os.environ.get("PROFILE") == "1")
+
+# The window, Pymunk space, players and scores the helpers below use, set
+# by run()
+screen = None
+space = None
+player1_shape = player2_shape = None
+player1_name = player2_name = None
+player1_score = 0
+player2_score = 0
 
 # Override the color_for_shape method
 def custom_color_for_shape(shape):
@@ -33,8 +42,6 @@ def custom_color_for_shape(shape):
         return shape.color + (255,)  # Add alpha channel
     return (200, 200, 200, 255)  # Default gray color
 
-draw_options.color_for_shape = custom_color_for_shape
-
 # Helper function to create a player ball
 def create_ball(x, y, radius, color):
     body = pymunk.Body(1, float('inf'))  # Dynamic body
@@ -54,12 +61,6 @@ def create_wall(start, end):
     shape.friction = 0.5
     space.add(body, shape)
 
-# Create walls (boundaries)
-create_wall((1, 1), (1, screen_height - 1))  # Left wall
-create_wall((1, screen_height - 1), (screen_width - 1, screen_height - 1))  # Bottom wall
-create_wall((screen_width - 1, screen_height - 1), (screen_width - 1, 1))  # Right wall
-create_wall((screen_width - 1, 1), (1, 1))  # Top wall
-
 # Create penalty lines
 def create_penalty_line(x1, y1, x2, y2):
     body = pymunk.Body(body_type=pymunk.Body.STATIC)
@@ -70,16 +71,9 @@ def create_penalty_line(x1, y1, x2, y2):
     space.add(body, shape)
     return shape
 
-penalty_lines = [
-    create_penalty_line(0, screen_height // 2 - 50, 0, screen_height // 2 + 50),  # Left center
-    create_penalty_line(screen_width, screen_height // 2 - 50, screen_width, screen_height // 2 + 50),  # Right center
-    create_penalty_line(screen_width // 2 - 50, 0, screen_width // 2 + 50, 0),  # Top center
-    create_penalty_line(screen_width // 2 - 50, screen_height, screen_width // 2 + 50, screen_height)  # Bottom center
-]
-
 # Function to display input screen for player names
 def get_player_names():
-    font = pygame.font.Font(None, 36)
+    font = text_renderer.get_font(None, 36)
     input_box1 = pygame.Rect(200, 200, 400, 50)
     input_box2 = pygame.Rect(200, 300, 400, 50)
     color_inactive = pygame.Color('lightskyblue3')
@@ -130,8 +124,8 @@ def get_player_names():
                         text2 += event.unicode
         
         screen.fill(WHITE)
-        txt_surface1 = font.render(text1, True, color1)
-        txt_surface2 = font.render(text2, True, color2)
+        txt_surface1 = text_renderer.render(text1, font, color1)
+        txt_surface2 = text_renderer.render(text2, font, color2)
         
         # Resize the box if the text is too long.
         width1 = max(400, txt_surface1.get_width() + 10)
@@ -148,27 +142,17 @@ def get_player_names():
         pygame.draw.rect(screen, color2, input_box2, 2)
         
         # Instruction text
-        instruction = font.render("Enter Player 1 and Player 2 Names", True, (0, 0, 0))
+        instruction = text_renderer.render("Enter Player 1 and Player 2 Names", font, (0, 0, 0))
         screen.blit(instruction, (200, 150))
         
         pygame.display.flip()
+        startup.first_frame()
         
         if text1 and text2 and not active1 and not active2:
             done = True
 
     return text1, text2
 
-# Get player names using the input screen
-player1_name, player2_name = get_player_names()
-
-# Create players as balls
-player1_body, player1_shape = create_ball(200, 275, 25, GREEN)
-player2_body, player2_shape = create_ball(600, 275, 25, BLUE)
-
-# Scores
-player1_score = 0
-player2_score = 0
-
 # Commentary list
 commentary = [
     "The arena is set, and the clash of titans begins! {player1_name} vs {player2_name}!",
@@ -220,9 +204,6 @@ def commentary_thread():
         if len(commentary) > 3:  # Limit commentary to last 10 messages
             commentary.pop(0)
 
-# Start the commentary thread
-threading.Thread(target=commentary_thread, daemon=True).start()
-
 # Collision handler for penalty lines
 def penalty_handler(arbiter, space, data):
     global player1_score, player2_score
@@ -233,84 +214,153 @@ def penalty_handler(arbiter, space, data):
         player2_score -= 1
     return True
 
-handler = space.add_collision_handler(0, 1)
-handler.begin = penalty_handler
-
-# Game loop
-clock = pygame.time.Clock()
-running = True
-movement_force = 500
-start_time = pygame.time.get_ticks()
-game_duration = 1 * 60 * 1000  # 2 minutes in milliseconds
-
-while running:
-    dt = clock.tick(60) / 1000  # Delta time in seconds
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
+# Open the window, build the world and play until the window is closed
+def run():
+    global screen, space, player1_shape, player2_shape, player1_name, player2_name, player1_score, player2_score
+    screen = startup.display((screen_width, screen_height), "Doging Rally")
+
+    # Initialize Pymunk space
+    space = pymunk.Space()
+    space.gravity = (0, 0)  # No gravity for this 2D plane
+
+    # Pymunk helper for drawing
+    draw_options = pymunk.pygame_util.DrawOptions(screen)
+    draw_options.color_for_shape = custom_color_for_shape
+
+    # Create walls (boundaries)
+    create_wall((1, 1), (1, screen_height - 1))  # Left wall
+    create_wall((1, screen_height - 1), (screen_width - 1, screen_height - 1))  # Bottom wall
+    create_wall((screen_width - 1, screen_height - 1), (screen_width - 1, 1))  # Right wall
+    create_wall((screen_width - 1, 1), (1, 1))  # Top wall
+
+    # Create penalty lines
+    penalty_lines = [
+        create_penalty_line(0, screen_height // 2 - 50, 0, screen_height // 2 + 50),  # Left center
+        create_penalty_line(screen_width, screen_height // 2 - 50, screen_width, screen_height // 2 + 50),  # Right center
+        create_penalty_line(screen_width // 2 - 50, 0, screen_width // 2 + 50, 0),  # Top center
+        create_penalty_line(screen_width // 2 - 50, screen_height, screen_width // 2 + 50, screen_height)  # Bottom center
+    ]
+
+    # Get player names using the input screen
+    player1_name, player2_name = get_player_names()
+
+    # Create players as balls
+    player1_body, player1_shape = create_ball(200, 275, 25, GREEN)
+    player2_body, player2_shape = create_ball(600, 275, 25, BLUE)
+
+    # Ball positions before the last tick, for drawing between ticks
+    bodies = InterpolatedBodies([player1_body, player2_body])
+
+    # Scores
+    player1_score = 0
+    player2_score = 0
+
+    # Start the commentary thread
+    threading.Thread(target=commentary_thread, daemon=True).start()
+
+    # Collision handler for penalty lines
+    handler = space.add_collision_handler(0, 1)
+    handler.begin = penalty_handler
+
+    # Game loop
+    clock = pygame.time.Clock()
+    loop = FixedTimestep(60)
+    running = True
+    movement_force = 500
+    start_time = pygame.time.get_ticks()
+    game_duration = 1 * 60 * 1000  # 2 minutes in milliseconds
+
+    # Fonts and the score line are set up once; the score only re-renders when it changes
+    font = text_renderer.get_font(None, 36)
+    commentary_font = text_renderer.get_font(None, 24)
+    score_label = TextLabel(text_renderer, "{}: {}  {}: {}", font, BLACK)
+
+    while running:
+        dt = clock.tick(60) / 1000  # Seconds since the last frame
+
+        with profiler.scope("input"):
+            for event in pygame.event.get():
+                profiler.handle_event(event)
+                if event.type == pygame.QUIT:
+                    running = False
+
+            # Handle player controls
+            keys = pygame.key.get_pressed()
+
+        # Step the physics at a fixed rate. Pymunk clears forces after every
+        # step, so the controls are applied again on each tick.
+        with profiler.scope("physics"):
+            for _ in range(loop.advance(dt)):
+                bodies.save()
+
+                # Player 1 controls
+                if keys[pygame.K_w]:
+                    player1_body.apply_force_at_local_point((0, -movement_force), (0, 0))
+                if keys[pygame.K_s]:
+                    player1_body.apply_force_at_local_point((0, movement_force), (0, 0))
+                if keys[pygame.K_a]:
+                    player1_body.apply_force_at_local_point((-movement_force, 0), (0, 0))
+                if keys[pygame.K_d]:
+                    player1_body.apply_force_at_local_point((movement_force, 0), (0, 0))
+
+                # Player 2 controls
+                if keys[pygame.K_UP]:
+                    player2_body.apply_force_at_local_point((0, -movement_force), (0, 0))
+                if keys[pygame.K_DOWN]:
+                    player2_body.apply_force_at_local_point((0, movement_force), (0, 0))
+                if keys[pygame.K_LEFT]:
+                    player2_body.apply_force_at_local_point((-movement_force, 0), (0, 0))
+                if keys[pygame.K_RIGHT]:
+                    player2_body.apply_force_at_local_point((movement_force, 0), (0, 0))
+
+                space.step(loop.dt)
+
+        # Check game timer
+        elapsed_time = pygame.time.get_ticks() - start_time
+        if elapsed_time > game_duration:
             running = False
 
-    # Handle player controls
-    keys = pygame.key.get_pressed()
-
-    # Player 1 controls
-    if keys[pygame.K_w]:
-        player1_body.apply_force_at_local_point((0, -movement_force), (0, 0))
-    if keys[pygame.K_s]:
-        player1_body.apply_force_at_local_point((0, movement_force), (0, 0))
-    if keys[pygame.K_a]:
-        player1_body.apply_force_at_local_point((-movement_force, 0), (0, 0))
-    if keys[pygame.K_d]:
-        player1_body.apply_force_at_local_point((movement_force, 0), (0, 0))
-
-    # Player 2 controls
-    if keys[pygame.K_UP]:
-        player2_body.apply_force_at_local_point((0, -movement_force), (0, 0))
-    if keys[pygame.K_DOWN]:
-        player2_body.apply_force_at_local_point((0, movement_force), (0, 0))
-    if keys[pygame.K_LEFT]:
-        player2_body.apply_force_at_local_point((-movement_force, 0), (0, 0))
-    if keys[pygame.K_RIGHT]:
-        player2_body.apply_force_at_local_point((movement_force, 0), (0, 0))
-
-    # Step the physics simulation
-    space.step(dt)
-
-    # Clear the screen
-    screen.fill(WHITE)
-
-    # Draw everything
-    space.debug_draw(draw_options)
-
-    # Draw scores
-    font = pygame.font.Font(None, 36)
-    score_text = font.render(f"{player1_name}: {player1_score}  {player2_name}: {player2_score}", True, BLACK)
-    screen.blit(score_text, (10, 10))
-
-    # Draw commentary
-    commentary_font = pygame.font.Font(None, 24)
-    y_offset = 50
-    for line in commentary:
-        comment_text = commentary_font.render(line, True, BLACK)
-        screen.blit(comment_text, (10, y_offset))
-        y_offset += 25
-
-    # Check game timer
-    elapsed_time = pygame.time.get_ticks() - start_time
-    if elapsed_time > game_duration:
-        running = False
-
-    # Update the display
-    pygame.display.flip()
-
-# Determine the winner
-if player1_score > player2_score:
-    print(f"{player1_name} wins with a score of {player1_score}!")
-    print(f"{player2_name} loses with a score of {player2_score}.")
-elif player2_score > player1_score:
-    print(f"{player2_name} wins with a score of {player2_score}!")
-    print(f"{player1_name} loses with a score of {player1_score}.")
-else:
-    print("It's a tie!")
-
-pygame.quit()
+        # Draw between the last two ticks; when frames fall behind some are
+        # not drawn at all so the physics keeps its pace
+        if loop.should_render():
+            # Clear the screen
+            with profiler.scope("draw"):
+                screen.fill(WHITE)
+
+                # Draw everything
+                with bodies.drawn_at(loop.alpha):
+                    space.debug_draw(draw_options)
+
+                # Draw scores
+                score_text = score_label.render(player1_name, player1_score, player2_name, player2_score)
+                screen.blit(score_text, (10, 10))
+
+                # Draw commentary
+                y_offset = 50
+                for line in commentary:
+                    comment_text = text_renderer.render(line, commentary_font, BLACK)
+                    screen.blit(comment_text, (10, y_offset))
+                    y_offset += 25
+
+                profiler.draw_overlay(screen)
+
+            # Update the display
+            with profiler.scope("flip"):
+                pygame.display.flip()
+        profiler.end_frame()
+
+    # Determine the winner
+    if player1_score > player2_score:
+        print(f"{player1_name} wins with a score of {player1_score}!")
+        print(f"{player2_name} loses with a score of {player2_score}.")
+    elif player2_score > player1_score:
+        print(f"{player2_name} wins with a score of {player2_score}!")
+        print(f"{player1_name} loses with a score of {player1_score}.")
+    else:
+        print("It's a tie!")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    run()
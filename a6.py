@@ -1,13 +1,12 @@
 import pygame
 import random
 
-# Initialize Pygame
-pygame.init()
+from engine import startup
+from engine.text import TextLabel, TextRenderer
 
 # Screen dimensions
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Battle of Bastards")
+screen = None  # opened by run()
 
 # Colors
 WHITE = (255, 255, 255)
@@ -20,6 +19,9 @@ GREEN = (0, 255, 0)
 clock = pygame.time.Clock()
 FPS = 60
 
+# Text rendering with cached fonts and surfaces
+text_renderer = TextRenderer()
+
 # Obstacles
 obstacles = [pygame.Rect(random.randint(100, 700), random.randint(100, 500), 50, 50) for _ in range(5)]
 
@@ -92,7 +94,9 @@ class Castle(pygame.sprite.Sprite):
         self.rect.topleft = (x, y)
 
 # Game loop
-def main():
+def run():
+    global screen
+    screen = startup.display((SCREEN_WIDTH, SCREEN_HEIGHT), "Battle of Bastards")
     running = True
 
     # Create player and groups
@@ -100,6 +104,9 @@ def main():
     enemies = pygame.sprite.Group([Enemy(random.randint(300, 700), random.randint(100, 500)) for _ in range(3)])
     castle = Castle(700, 250)
 
+    font = text_renderer.get_font(None, 30, sysfont=True)
+    health_label = TextLabel(text_renderer, "Health: {}", font, WHITE)
+
     while running:
         screen.fill(BLACK)
         keys = pygame.key.get_pressed()
@@ -142,15 +149,15 @@ def main():
         screen.blit(castle.image, castle.rect)
 
         # Display health
-        font = pygame.font.SysFont(None, 30)
-        health_text = font.render(f"Health: {player.health}", True, WHITE)
+        health_text = health_label.render(player.health)
         screen.blit(health_text, (10, 10))
 
         # Update screen
         pygame.display.flip()
+        startup.first_frame()
         clock.tick(FPS)
 
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run()
@@ -0,0 +1,112 @@
+# Balance sweeps for the castle game (a7).
+# Runs many headless episodes across all CPU cores and streams one CSV row per
+# episode to disk as soon as it finishes.
+#
+# Example: 20 episodes for every combination of the listed values
+#     python a7_balance_sweep.py --episodes 20 --health 1.1 1.2 1.3 \
+#         --enemy-count 3-20 10-40 --out sweep.csv
+import argparse
+import csv
+import itertools
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+COLUMNS = [
+    "episode", "seed",
+    "enemy_count_min", "enemy_count_max", "enemy_speed_min", "enemy_speed_max",
+    "health_mult", "attack_power_mult", "attack_range_mult",
+    "outcome", "levels_cleared", "ticks", "score", "damage_taken", "health",
+]
+
+game = None
+
+
+# Each worker imports its own headless copy of the game once.
+# The game loads its assets relative to this folder.
+def init_worker():
+    global game
+    os.environ["A7_HEADLESS"] = "1"
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import a7_got_attack_on_castle
+    game = a7_got_attack_on_castle
+
+
+def run_episode(task):
+    params, episode, seed, max_levels, max_ticks, max_idle_ticks = task
+    game.ENEMY_COUNT_RANGE = (params["enemy_count_min"], params["enemy_count_max"])
+    game.ENEMY_SPEED_RANGE = (params["enemy_speed_min"], params["enemy_speed_max"])
+    game.LEVEL_UP_MULTIPLIERS = dict(
+        game.LEVEL_UP_MULTIPLIERS,
+        health=params["health_mult"],
+        attack_power=params["attack_power_mult"],
+        attack_range=params["attack_range_mult"],
+    )
+    result = game.run_headless(seed=seed, max_levels=max_levels, max_ticks=max_ticks, max_idle_ticks=max_idle_ticks)
+    return dict(params, episode=episode, seed=seed, **result)
+
+
+# "3-20" -> (3, 20)
+def int_range(text):
+    low, _, high = text.partition("-")
+    return int(low), int(high or low)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sweep level balance parameters of the castle game")
+    parser.add_argument("--enemy-count", type=int_range, nargs="+", default=[(3, 20)], help="slimes per level, as MIN-MAX")
+    parser.add_argument("--enemy-speed", type=int_range, nargs="+", default=[(1, 3)], help="slime speed, as MIN-MAX")
+    parser.add_argument("--health", type=float, nargs="+", default=[1.20], help="level-up health multipliers")
+    parser.add_argument("--attack-power", type=float, nargs="+", default=[1.10], help="level-up attack power multipliers")
+    parser.add_argument("--attack-range", type=float, nargs="+", default=[1.20], help="level-up attack range multipliers")
+    parser.add_argument("--episodes", type=int, default=10, help="episodes per parameter combination")
+    parser.add_argument("--levels", type=int, default=5, help="levels per episode")
+    parser.add_argument("--ticks", type=int, default=60 * 60 * 10, help="tick limit per episode")
+    parser.add_argument("--idle-ticks", type=int, default=60 * 60, help="end an episode as stalled after this many ticks without progress")
+    parser.add_argument("--seed", type=int, default=0, help="base seed; episode seeds are derived from it")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--out", default="balance_sweep.csv", help="CSV file to write")
+    return parser.parse_args()
+
+
+def tasks(args):
+    seeds = random.Random(args.seed)
+    combos = itertools.product(args.enemy_count, args.enemy_speed, args.health, args.attack_power, args.attack_range)
+    episode = 0
+    for (count_min, count_max), (speed_min, speed_max), health, attack_power, attack_range in combos:
+        params = {
+            "enemy_count_min": count_min, "enemy_count_max": count_max,
+            "enemy_speed_min": speed_min, "enemy_speed_max": speed_max,
+            "health_mult": health, "attack_power_mult": attack_power, "attack_range_mult": attack_range,
+        }
+        for _ in range(args.episodes):
+            yield params, episode, seeds.getrandbits(32), args.levels, args.ticks, args.idle_ticks
+            episode += 1
+
+
+def main():
+    args = parse_args()
+    pending_limit = args.workers * 4  # keep memory flat however big the sweep is
+    done = 0
+
+    with open(args.out, "w", newline="") as out, ProcessPoolExecutor(args.workers, initializer=init_worker) as pool:
+        writer = csv.DictWriter(out, fieldnames=COLUMNS)
+        writer.writeheader()
+        pending = set()
+        todo = tasks(args)
+        while True:
+            for task in itertools.islice(todo, pending_limit - len(pending)):
+                pending.add(pool.submit(run_episode, task))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                writer.writerow(future.result())
+                done += 1
+            out.flush()
+            print(f"\r{done} episodes written to {args.out}", end="", flush=True)
+    print()
+
+
+if __name__ == "__main__":
+    main()
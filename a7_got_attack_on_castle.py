@@ -1,28 +1,69 @@
+import argparse
+import os
 import pygame
 import random
-import sys 
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
 
-# Initialize Pygame
-pygame.init()
+from engine import startup
+from engine.collision import StaticCollisionIndex, mask_for
+from engine.assets import AssetManager
+from engine.bundle import open_bundle, save_bundle
+from engine.flowfield import FlowField
+from engine.hitbox import ConeHitbox, Hitbox
+from engine.loader import AssetLoader
+from engine.pool import Pool
+from engine.loop import FixedTimestep, InterpolatedSprites
+from engine.animation import AnimationClock
+from engine.profiler import FrameProfiler
+from engine.registry import Registry
+from engine.render import DirtyRenderer, FullRenderer
+from engine.scheduler import AIScheduler
+from engine.spawner import PoissonDiskSampler, WaveSpawner
+from engine.spatial_grid import SpatialGrid
+from engine.text import TextLabel, TextRenderer
+from engine.tilemap import Camera, TileMap, slice_tileset
 
-# Initialize the mixer
-pygame.mixer.init()
+# Headless mode: no window and no sound, for simulations and tools.
+# Set A7_HEADLESS=1 before importing, or pass --headless on the command line.
+# Importing opens no window and starts no sound either way: the display comes
+# up with the first level (or run()), the mixer with the first sound.
+HEADLESS = os.environ.get("A7_HEADLESS") == "1"
+if HEADLESS:
+    startup.use_dummy_drivers()
 
-# Load the music file
-pygame.mixer.music.load("assets/music/time_for_adventure.mp3")
+# Music and the attack sound, played only with a window and an audio device.
+# They load in the background once the game can start (see load_assets), and
+# the game plays silent until they are in.
+MUSIC_PATH = "assets/music/time_for_adventure.mp3"
+ATTACK_SOUND_PATH = "assets/sound/attack.wav"
+attack_sound = None
 
-# Load the attack sound
-attack_sound = pygame.mixer.Sound("assets/sound/attack.wav")
-# pygame.mixer.Sound.set_volume(attack_sound, 0.1)
+def play_music():
+    pygame.mixer.music.play(-1)  # -1 means the music will loop indefinitely
+    pygame.mixer.music.set_volume(0.5)
 
-# Play the music
-pygame.mixer.music.play(-1)  # -1 means the music will loop indefinitely
-pygame.mixer.music.set_volume(0.5)
+def set_attack_sound(sound):
+    global attack_sound
+    attack_sound = sound
+    # attack_sound.set_volume(0.1)
+
+def play_attack_sound():
+    if attack_sound is not None:
+        attack_sound.play()
 
 # Screen dimensions
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Battle of Bastards")
+# World size; a world bigger than the screen scrolls with the player
+WORLD_WIDTH, WORLD_HEIGHT = SCREEN_WIDTH, SCREEN_HEIGHT
+screen = None
+
+# The window, opened on the first call
+def init_display():
+    global screen
+    screen = startup.display((SCREEN_WIDTH, SCREEN_HEIGHT), "Battle of Bastards")
+    return screen
 
 # Colors
 WHITE = (255, 255, 255)
@@ -36,6 +77,85 @@ YELLOW = (255, 255, 0)
 clock = pygame.time.Clock()
 FPS = 60
 
+# Random streams, one per purpose, so a seed reproduces a whole run
+spawn_rng = random.Random()     # enemy counts and spawn positions
+stats_rng = random.Random()     # enemy speed and chase radius
+obstacle_rng = random.Random()  # tree placement
+tile_rng = random.Random()      # grass tiles
+
+def seed_rngs(seed):
+    seeder = random.Random(seed)
+    for rng in (spawn_rng, stats_rng, obstacle_rng, tile_rng):
+        rng.seed(seeder.getrandbits(64))
+
+# Slimes per level and their speed range
+ENEMY_COUNT_RANGE = (3, 20)
+ENEMY_SPEED_RANGE = (1, 3)
+
+# A level's slimes come in ENEMY_WAVES waves, WAVE_DELAY ticks apart.
+# Spawning takes at most SPAWN_BUDGET_MS per tick, so a big wave comes in
+# over a few ticks; None spawns it all at once.
+ENEMY_WAVES = 1
+WAVE_DELAY = 600
+SPAWN_BUDGET_MS = 2.0
+
+# Stat multipliers applied to the player on every level up
+LEVEL_UP_MULTIPLIERS = {"health": 1.20, "attack_power": 1.10, "attack_range": 1.20, "speed": 1.1}
+LEVEL_UP_SCORE_BONUS = 50
+
+# Text rendering with cached fonts and surfaces
+text_renderer = TextRenderer()
+
+# Every image is loaded through this cache, which keeps at most
+# ASSET_BUDGET bytes of decoded pixels. ASSET_BUNDLE holds them ready to
+# blit from the last start; it is rewritten when missing or out of date, or
+# by running this file with --build-bundle. Nothing is loaded before
+# load_assets(), which the first level calls.
+ASSET_BUDGET = 32 * 1024 * 1024
+ASSET_BUNDLE = "assets/a7.bundle"
+assets = AssetManager(ASSET_BUDGET)
+
+# Frame profiler: set PROFILE=1 or press F3 in game, F4 exports a trace
+profiler = FrameProfiler(enabled=os.environ.get("PROFILE") == "1")
+
+# Rendering mode: "full" redraws the whole screen every frame, "dirty" only
+# redraws and presents the rects that changed (the grass and trees are static)
+RENDER_MODE = "full"
+
+# Spatial index for enemy and obstacle lookups
+GRID_CELL_SIZE = 128
+GRID_MARGIN = 24  # how far an enemy may drift from its indexed cell within a frame
+enemy_grid = SpatialGrid(GRID_CELL_SIZE)
+
+# Trees never move within a level: they are listed in every cell of a coarse
+# grid they cover and tested against their pixel mask, not their whole box
+OBSTACLE_CELL_SIZE = 128
+obstacle_grid = StaticCollisionIndex(OBSTACLE_CELL_SIZE)
+
+# Slimes walk around trees along a flow field toward the player, rebuilt
+# when the player enters another cell. None makes them head straight over.
+FLOW_CELL_SIZE = 48
+FLOW_FIELD_RANGE = 1000  # the longest chase radius
+flow_field = None
+
+# Enemy simulation backend: "sprites" updates one Enemy object at a time,
+# "swarm" steps all slimes at once in NumPy arrays (needs numpy), "shared"
+# keeps those arrays in shared memory and steps them in SWARM_WORKERS
+# processes, each over a strip of the world (None: one per core)
+ENEMY_BACKEND = "sprites"
+SWARM_WORKERS = None
+swarm = None
+
+# AI level of detail for the "sprites" backend: slimes within
+# AI_NEAR_DISTANCE of the knight think every tick, ones chasing from
+# further off every AI_FAR_INTERVAL ticks and ones outside their chase
+# radius every AI_IDLE_INTERVAL ticks, coasting in between. The far and
+# idle ones may take at most AI_BUDGET_MS per tick; None lifts the limit.
+AI_NEAR_DISTANCE = 300
+AI_FAR_INTERVAL = 3
+AI_IDLE_INTERVAL = 8
+AI_BUDGET_MS = 2.0
+
 # Sprite sheet paths and details
 WALKING_SPRITE_SHEET_PATH = "assets/knight/walking.png"
 WALKING_SPRITE_COLUMNS = 8
@@ -51,6 +171,12 @@ ATTACK_SPRITE_SHEET_PATH = "assets/knight/attack.png"
 ATTACK_SPRITE_COLUMNS = 10
 ATTACK_SPRITE_WIDTH = 80
 ATTACK_SPRITE_HEIGHT = 42
+# Frames of the attack animation on which the swing can hit. "box" hits
+# attack_range in front of the knight, "cone" a quarter circle around the
+# facing direction.
+ATTACK_ACTIVE_FRAMES = range(3, 7)
+ATTACK_SHAPE = "box"
+FACING = {'right': (1, 0), 'left': (-1, 0), 'up': (0, -1), 'down': (0, 1)}
 
 
 SLIME_SPRITE_SHEET_PATH = "assets/slime/slime_purple.png"
@@ -60,48 +186,222 @@ SLIME_SPRITE_WIDTH = 24
 SLIME_SPRITE_HEIGHT = 24 
 
 
-# Load background image
-BACKGROUNG_IMAGE_PATH = "assets/background/TX_Tileset_Grass.png"
-background_image = pygame.image.load(BACKGROUNG_IMAGE_PATH).convert() 
-background_image = pygame.transform.scale(background_image, (SCREEN_WIDTH, SCREEN_HEIGHT))
-
-
-# Load sprite sheets
-walking_sprite_sheet = pygame.image.load(WALKING_SPRITE_SHEET_PATH).convert_alpha()
-idle_sprite_sheet = pygame.image.load(IDLE_SPRITE_SHEET_PATH).convert_alpha()
-attack_sprite_sheet = pygame.image.load(ATTACK_SPRITE_SHEET_PATH).convert_alpha()
-slime_sprite_sheet = pygame.image.load(SLIME_SPRITE_SHEET_PATH).convert_alpha()
-
-# Function to extract frames from the sprite sheet
-def load_frames(sprite_sheet, columns, width, height, scale_factor=2, rows=1):
-    frames = []
-    for row in range(rows):
-        for col in range(columns):
-            x = col * width
-            y = row * height
-            frame = sprite_sheet.subsurface((x, y, width, height))
-            scaled_frame = pygame.transform.scale(frame, (width * scale_factor, height * scale_factor))
-            frames.append(scaled_frame)
-    return frames
-
-# Extract frames for different actions
-walking_frames = load_frames(walking_sprite_sheet, WALKING_SPRITE_COLUMNS, WALKING_SPRITE_WIDTH, WALKING_SPRITE_HEIGHT)
-idle_frames = load_frames(idle_sprite_sheet, IDLE_SPRITE_COLUMNS, IDLE_SPRITE_WIDTH, IDLE_SPRITE_HEIGHT)
-attack_frames = load_frames(attack_sprite_sheet, ATTACK_SPRITE_COLUMNS, ATTACK_SPRITE_WIDTH, ATTACK_SPRITE_HEIGHT)
-slime_frames = load_frames(slime_sprite_sheet, SLIME_SPRITE_COLUMNS, SLIME_SPRITE_WIDTH, SLIME_SPRITE_HEIGHT, 3, SLIME_SPRITE_ROWS)
-
-# Obstacles
-def generate_obstacles():
-    obstacles = []
-    obstacle_image = pygame.image.load("assets/obstacle/tree_one.png").convert_alpha()
-    obstacle_image = pygame.transform.scale(obstacle_image, (114, 141))
-    for _ in range(2):
-        while True:
-            obstacle_rect = obstacle_image.get_rect(topleft=(random.randint(100, 700), random.randint(100, 500)))
-            if not obstacle_rect.colliderect(player.rect):
-                obstacles.append((obstacle_image, obstacle_rect))
-                break
-    return obstacles
+# Background tiles. The tileset is 8x8 tiles of 32 px: the top-left 4x4 are
+# plain grass, the 4x4 next to them grass with flowers and pebbles.
+TILESET_PATH = "assets/background/TX_Tileset_Grass.png"
+TILE_SIZE = 32
+TILE_SCALE = 2
+GRASS_TILES = [row * 8 + column for row in range(4) for column in range(4)]
+FLOWER_TILES = [row * 8 + column for row in range(4) for column in range(4, 8)]
+FLOWER_TILE_WEIGHT = 0.15  # relative to a plain grass tile
+tiles = None
+
+# Trees per screen-sized area of the world
+TREES_PER_SCREEN = 2
+
+# The current level's tile world and the camera looking at it
+world = None
+camera = None
+
+
+# Castle door and tree, shared by every level: (path, scale)
+CASTLE_IMAGE = ("assets/castle/door.png", 2)
+TREE_IMAGE = ("assets/obstacle/tree_one.png", (114, 141))
+castle_image = None
+tree_image = None
+
+# Frames for different actions, and the load_frames arguments they are made
+# with
+FRAME_SHEETS = {
+    "walking": (WALKING_SPRITE_SHEET_PATH, WALKING_SPRITE_COLUMNS, WALKING_SPRITE_WIDTH, WALKING_SPRITE_HEIGHT),
+    "idle": (IDLE_SPRITE_SHEET_PATH, IDLE_SPRITE_COLUMNS, IDLE_SPRITE_WIDTH, IDLE_SPRITE_HEIGHT),
+    "attack": (ATTACK_SPRITE_SHEET_PATH, ATTACK_SPRITE_COLUMNS, ATTACK_SPRITE_WIDTH, ATTACK_SPRITE_HEIGHT),
+    "slime": (SLIME_SPRITE_SHEET_PATH, SLIME_SPRITE_COLUMNS, SLIME_SPRITE_WIDTH, SLIME_SPRITE_HEIGHT, 3, SLIME_SPRITE_ROWS),
+}
+walking_frames = idle_frames = attack_frames = slime_frames = None
+
+# Walking, idle and slime animations are clips on one clock, advanced once
+# per tick; a sprite keeps only its clip and the tick it started it.
+# FRAME_TICKS is how many ticks each of their frames is shown.
+FRAME_TICKS = 10
+animation = AnimationClock()
+
+# Loads images and sounds on worker threads, set by load_assets()
+loader = None
+
+# Frames of a sprite sheet for every facing direction, flipped once here so
+# the animation code only ever looks surfaces up
+def load_frames(path, columns, width, height, scale_factor=2, rows=1):
+    frames = assets.frames(path, columns, width, height, rows, scale_factor)
+    flipped_frames = assets.frames(path, columns, width, height, rows, scale_factor, flip=True)
+    # There is no up/down art yet, so those reuse the right-facing frames
+    return {'right': frames, 'left': flipped_frames, 'up': frames, 'down': frames}
+
+# Progress bar shown until the loader has what the first level needs
+def show_loading_screen(loader):
+    font = text_renderer.get_font(None, 30, sysfont=True)
+    bar = pygame.Rect(SCREEN_WIDTH // 4, SCREEN_HEIGHT // 2, SCREEN_WIDTH // 2, 20)
+    while not loader.critical_ready():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+        done, total = loader.progress()
+        screen.fill(BLACK)
+        screen.blit(text_renderer.render("Loading...", font, WHITE), (bar.x, bar.y - 40))
+        pygame.draw.rect(screen, WHITE, (bar.x, bar.y, bar.width * done // max(total, 1), bar.height))
+        pygame.draw.rect(screen, WHITE, bar, 1)
+        pygame.display.flip()
+        # Wait for the workers instead of a clock tick, so the game starts
+        # the moment the last image is in
+        loader.wait(timeout=1 / FPS)
+
+# Load every image the game uses, once. The workers decode them while the
+# main thread shows the loading screen; converting them needs the display,
+# so it is opened here if it is not yet. The sounds are left loading in the
+# background, finished by loader.poll() in the game loop.
+def load_assets():
+    global tiles, castle_image, tree_image, walking_frames, idle_frames, attack_frames, slime_frames, loader
+    if tiles is not None:
+        return
+    init_display()
+    assets.bundle = open_bundle(ASSET_BUNDLE)
+    loader = AssetLoader(assets)
+    loader.image(TILESET_PATH, convert="opaque", critical=True)
+    loader.image(*CASTLE_IMAGE, critical=True)
+    loader.image(*TREE_IMAGE, critical=True)
+    for path, columns, width, height, *options in FRAME_SHEETS.values():
+        scale_factor, rows = options if options else (2, 1)
+        for flip in (False, True):
+            loader.frames(path, columns, width, height, rows, scale_factor, flip, critical=True)
+    loader.start()
+    if HEADLESS:
+        loader.wait()
+    else:
+        show_loading_screen(loader)
+
+    # Everything the first level needs is in the cache now
+    tiles = slice_tileset(assets.image(TILESET_PATH, convert="opaque"), TILE_SIZE, TILE_SCALE)
+    castle_image = assets.image(*CASTLE_IMAGE)
+    tree_image = assets.image(*TREE_IMAGE)
+    walking_frames = load_frames(*FRAME_SHEETS["walking"])
+    idle_frames = load_frames(*FRAME_SHEETS["idle"])
+    attack_frames = load_frames(*FRAME_SHEETS["attack"])
+    slime_frames = load_frames(*FRAME_SHEETS["slime"])
+
+    # Everything is loaded now; keep it for the next start unless the bundle
+    # already had it all. The game runs the same without a bundle.
+    if assets.bundle is None or assets.bundle_misses:
+        try:
+            save_bundle(ASSET_BUNDLE, assets)
+        except OSError:
+            pass
+    startup.mark("assets")
+
+    if not HEADLESS and startup.mixer():
+        loader.call(pygame.mixer.Sound, ATTACK_SOUND_PATH, done=set_attack_sound)
+        loader.call(pygame.mixer.music.load, MUSIC_PATH, done=lambda _: play_music())
+
+# Obstacles, none of them over keep_clear (the player's rect by default) or
+# each other. Fewer than asked for when the world is too full of trees.
+def generate_obstacles(keep_clear=None):
+    if keep_clear is None:
+        keep_clear = player.rect
+    obstacle_image = tree_image
+    count = max(TREES_PER_SCREEN, round(TREES_PER_SCREEN * WORLD_WIDTH * WORLD_HEIGHT / (SCREEN_WIDTH * SCREEN_HEIGHT)))
+    area = pygame.Rect(100, 100, WORLD_WIDTH - 200, WORLD_HEIGHT - 200)
+    sampler = PoissonDiskSampler(obstacle_rng, area, *obstacle_image.get_size())
+    sampler.block(keep_clear)
+    return [(obstacle_image, obstacle_image.get_rect(topleft=point)) for point in sampler.sample(count)]
+
+# Random grass tiles covering the world, with the trees baked in; everything
+# that never moves during a level. tilemap is reused when it fits.
+def build_world(obstacles, tilemap=None):
+    tile_size = TILE_SIZE * TILE_SCALE
+    columns, rows = -(-WORLD_WIDTH // tile_size), -(-WORLD_HEIGHT // tile_size)
+    if tilemap is None or (tilemap.columns, tilemap.rows) != (columns, rows):
+        tilemap = TileMap(tiles, columns, rows)
+    else:
+        tilemap.clear_decorations()
+    weights = [1] * len(GRASS_TILES) + [FLOWER_TILE_WEIGHT] * len(FLOWER_TILES)
+    tilemap.fill_random(tile_rng, GRASS_TILES + FLOWER_TILES, weights)
+    for obstacle in obstacles:
+        tilemap.add_decoration(obstacle[0], obstacle[1])
+    return tilemap
+
+# Index the static obstacles once per level, reusing index when it fits
+def index_obstacles(obstacles, index=None):
+    if index is None or index.cell_size != OBSTACLE_CELL_SIZE:
+        index = StaticCollisionIndex(OBSTACLE_CELL_SIZE)
+    else:
+        index.clear()
+    for obstacle in obstacles:
+        index.add(obstacle, obstacle[1], mask_for(obstacle[0]))
+    return index
+
+# Cells of the flow field a slime cannot stand in without touching a tree,
+# computed once per level, reusing field when it fits
+def build_flow_field(obstacles, field=None):
+    width, height = slime_frames['right'][0].get_size()
+    if field is None or (field.width, field.height, field.cell_size, field.max_distance) != (WORLD_WIDTH, WORLD_HEIGHT, FLOW_CELL_SIZE, FLOW_FIELD_RANGE):
+        field = FlowField(WORLD_WIDTH, WORLD_HEIGHT, FLOW_CELL_SIZE, FLOW_FIELD_RANGE)
+    else:
+        field.clear()
+    for obstacle in obstacles:
+        field.block_rect(obstacle[1], width, height)
+    return field
+
+# The obstacles as the swarm pushes slimes out of them: each rect with the
+# solid pixels of its image's mask, worked out once per image
+def solid_obstacles(obstacles):
+    from engine.swarm import solid_counts
+    counts = {}
+    solids = []
+    for image, rect in obstacles:
+        if image not in counts:
+            counts[image] = solid_counts(mask_for(image))
+        solids.append((rect, counts[image]))
+    return solids
+
+# Obstacles whose solid pixels touch rect (whose box does, when no index is set)
+def colliding_obstacles(rect):
+    if obstacle_grid is None:
+        return [obstacle for obstacle in obstacles if rect.colliderect(obstacle[1])]
+    return obstacle_grid.colliding(rect)
+
+# Enemies that may touch rect (all of them when no index is set)
+def nearby_enemies(rect):
+    if swarm is not None:
+        return swarm.views_touching(rect, GRID_MARGIN)
+    if enemy_grid is None:
+        return enemies
+    return enemy_grid.query(rect, GRID_MARGIN)
+
+# Ticks between a slime's full updates, by how far it is from the knight
+def ai_interval(enemy, player):
+    dx = player.rect.x - enemy.rect.x
+    dy = player.rect.y - enemy.rect.y
+    distance_squared = dx * dx + dy * dy
+    if distance_squared < AI_NEAR_DISTANCE ** 2:
+        return 1
+    if distance_squared < enemy.max_radius ** 2:
+        return AI_FAR_INTERVAL
+    return AI_IDLE_INTERVAL
+
+ai = AIScheduler(ai_interval, AI_BUDGET_MS)
+
+# Re-index the enemies, then update them against their neighbours, the far
+# ones only now and then
+def update_enemies(player):
+    if flow_field is not None:
+        flow_field.update(*player.rect.center)
+    if swarm is not None:
+        swarm.step(player.rect, swarm_obstacles, flow_field)
+        swarm.sync_views()
+        return
+    if enemy_grid is not None:
+        enemy_grid.rebuild(enemies)
+    ai.run(enemies, player)
 
 # Player class
 class Player(pygame.sprite.Sprite):
@@ -110,9 +410,17 @@ class Player(pygame.sprite.Sprite):
         self.walking_frames = walking_frames
         self.idle_frames = idle_frames
         self.attack_frames = attack_frames
+        self.reset(x, y, health, attack_power, attack_range, speed, score)
+
+    # Put the knight back at (x, y) with fresh stats, for the next level
+    def reset(self, x, y, health=200, attack_power=20, attack_range=100, speed=2, score=0):
+        self.walking_clip = animation.clip(self.walking_frames, FRAME_TICKS)
+        self.idle_clip = animation.clip(self.idle_frames, FRAME_TICKS)
+        self.clip = None
         self.current_frames = self.idle_frames
         self.current_frame = 0
-        self.image = self.current_frames[self.current_frame]
+        self.player_direction = 'right'
+        self.play(self.idle_clip)
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
 
@@ -122,22 +430,32 @@ class Player(pygame.sprite.Sprite):
         self.speed = speed
         self.score = score
         
-        self.player_direction = 'right'
         self.action_state = 'idle'  # 'idle', 'walking', 'attacking'
-        self.frame_rate = 10
-        self.animation_timer = 0
         self.attacking = False
         self.attack_animation_timer = 0
         self.attack_frame_rate = 15
+        self.attack_rect = None  # hit area of the last live swing tick, drawn for one frame
+        if ATTACK_SHAPE == "cone":
+            self.hitbox = ConeHitbox(attack_power, ATTACK_ACTIVE_FRAMES)
+        else:
+            self.hitbox = Hitbox(attack_power, ATTACK_ACTIVE_FRAMES)
 
-    def update_animation(self):
-        self.animation_timer += 1
-        if self.animation_timer >= self.frame_rate:
-            self.animation_timer = 0
-            self.current_frame = (self.current_frame + 1) % len(self.current_frames)
-            self.image = self.current_frames[self.current_frame]
-            if self.player_direction == 'left':
-                self.image = pygame.transform.flip(self.image, True, False)
+    # Show the clip's current frame, starting it over if it was not playing.
+    # The attack animation is not a clip: its frame number is stepped with
+    # the swing, since it decides when the hitbox is live.
+    def play(self, clip):
+        if self.clip is not clip:
+            self.clip = clip
+            self.phase = animation.tick
+        self.show(clip.image(self.player_direction, self.phase))
+
+    # Show image with the knight where the idle frames have him. The sheets
+    # line their frames up on the left edge, so once flipped to face left
+    # the wider attack frames are drawn further left by the extra width.
+    def show(self, image):
+        self.image = image
+        extra = image.get_width() - self.idle_frames['right'][0].get_width()
+        self.image_offset = (-extra, 0) if self.player_direction == 'left' else (0, 0)
 
     def update(self, keys):
         old_x, old_y = self.rect.x, self.rect.y
@@ -147,14 +465,12 @@ class Player(pygame.sprite.Sprite):
             self.current_frames = self.attack_frames
             self.current_frame += 1
 
-            if self.current_frame >= len(self.current_frames):
+            if self.current_frame >= len(self.current_frames['right']):
                 self.attacking = False
                 self.current_frames = self.idle_frames
                 self.current_frame = 0
             else:
-                self.image = self.current_frames[self.current_frame]
-                # if self.player_direction == 'left':
-                #     self.image = pygame.transform.flip(self.image, True, False)
+                self.show(self.current_frames[self.player_direction][self.current_frame])
                 
         # return  # Skip movement if attacking
 
@@ -175,88 +491,100 @@ class Player(pygame.sprite.Sprite):
             self.player_direction = 'right'
             moved = True
 
-        for obstacle in obstacles:
-            if self.rect.colliderect(obstacle[1]):
-                self.rect.x, self.rect.y = old_x, old_y
+        if colliding_obstacles(self.rect):
+            self.rect.x, self.rect.y = old_x, old_y
+
+        # Stay inside the world
+        if camera is not None:
+            self.rect.clamp_ip(camera.world_rect)
 
         if self.attacking:
             return
-        
-        if moved:
-            if self.current_frames != self.walking_frames:
-                self.current_frames = self.walking_frames
-                self.current_frame = 0
-            self.update_animation()
-        else:
-            if self.current_frames != self.idle_frames:
-                self.current_frames = self.idle_frames
-                self.current_frame = 0
-            self.update_animation()
+
+        self.play(self.walking_clip if moved else self.idle_clip)
      
-    def attack(self, enemies):
-        pygame.mixer.Sound.play(attack_sound)
+    def attack(self):
+        play_attack_sound()
         if not self.attacking:
             self.attacking = True
             self.action_state = 'attacking'
             self.attack_animation_timer = 0
+            self.current_frames = self.attack_frames
+            self.current_frame = 0
+            self.clip = None
+            self.show(self.current_frames[self.player_direction][0])
+            self.hitbox.start()
 
-            attack_rect = self.rect.copy()
-            if self.player_direction == 'right':
-                attack_rect.width = self.attack_range
-            elif self.player_direction == 'left':
-                attack_rect.x -= (self.attack_range - self.rect.width)
-                attack_rect.width = self.attack_range
-            elif self.player_direction == 'up':
-                attack_rect.y -= (self.attack_range - self.rect.height)
-                attack_rect.height = self.attack_range
-            elif self.player_direction == 'down':
-                attack_rect.height = self.attack_range
-
-            pygame.draw.rect(screen, YELLOW, attack_rect, 1)
-            for idx, enemy in enumerate(enemies):
-                if attack_rect.colliderect(enemy.rect):
-                    enemy.health -= self.attack_power
-                    self.score += 1
-                    print(f"Enemy {idx} attacked. Remaining Health: {enemy.health}")
+    # Point the hitbox where the knight is facing
+    def aim_hitbox(self):
+        if isinstance(self.hitbox, ConeHitbox):
+            self.hitbox.aim(self.rect.center, FACING[self.player_direction], self.attack_range)
+            return
+        attack_rect = self.rect.copy()
+        if self.player_direction == 'right':
+            attack_rect.width = self.attack_range
+        elif self.player_direction == 'left':
+            attack_rect.x -= (self.attack_range - self.rect.width)
+            attack_rect.width = self.attack_range
+        elif self.player_direction == 'up':
+            attack_rect.y -= (self.attack_range - self.rect.height)
+            attack_rect.height = self.attack_range
+        elif self.player_direction == 'down':
+            attack_rect.height = self.attack_range
+        self.hitbox.aim(attack_rect)
+
+    # On the swing's active frames, add a (enemy, damage) event to `events`
+    # for every enemy the hitbox reaches that this swing has not hit yet
+    def strike(self, events):
+        if not self.attacking or not self.hitbox.active(self.current_frame):
+            return
+        self.aim_hitbox()
+        self.attack_rect = self.hitbox.rect
+        self.hitbox.collect(nearby_enemies(self.hitbox.rect), events)
 
 # Enemy class
 class Enemy(pygame.sprite.Sprite):
+    image_offset = (0, 0)  # where the image is drawn from the rect's top-left
+
     def __init__(self, x, y, slime_frames):
         super().__init__()
-        self.slime_frames = slime_frames
-        self.current_frames = self.slime_frames
-        self.current_frame = 0
-        self.image = self.current_frames[self.current_frame]
+        self.reset(x, y, slime_frames)
+
+    # Fresh state for a slime taken from the pool
+    def reset(self, x, y, slime_frames):
+        self.clip = animation.clip(slime_frames, FRAME_TICKS)
+        self.phase = animation.tick
+        self.player_direction = 'right'
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
         
-        self.player_direction = 'right'
         self.action_state = 'walking'  # 'idle', 'walking', 'attacking'
-        self.frame_rate = 10
-        self.animation_timer = 0
+        self.velocity = (0, 0)  # last chase step, repeated by coast()
+        self.ai_due = None  # next full update, set by the AI scheduler
 
+        self.entity = None  # registry entity while in play
         self.health = 50
-        self.speed = random.randint(1, 3)
+        self.speed = stats_rng.randint(*ENEMY_SPEED_RANGE)
         
         self.initial_position = (x, y)
-        self.max_radius = random.randint(600, 1000)
+        self.max_radius = stats_rng.randint(600, 1000)
 
-    def update_animation(self):
-        self.animation_timer += 1
-        if self.animation_timer >= self.frame_rate:
-            self.animation_timer = 0
-            self.current_frame = (self.current_frame + 1) % len(self.current_frames)
-            self.image = self.current_frames[self.current_frame]
-            if self.player_direction == 'left':
-                self.image = pygame.transform.flip(self.image, True, False)        
+    # The slime's frame, looked up on the shared clip when drawn
+    @property
+    def image(self):
+        return self.clip.image(self.player_direction, self.phase)
 
     def update(self, player):
         # Save current position to check for collisions
         old_x, old_y = self.rect.x, self.rect.y
 
-        # Chase player if within radius
+        # Chase player if within radius, around trees along the flow field
         distance_to_player = ((player.rect.x - self.rect.x) ** 2 + (player.rect.y - self.rect.y) ** 2) ** 0.5
-        if distance_to_player < self.max_radius:
+        step = None if flow_field is None else flow_field.step(*self.rect.center)
+        if distance_to_player < self.max_radius and step is not None:
+            self.rect.x += step[0] * self.speed
+            self.rect.y += step[1] * self.speed
+        elif distance_to_player < self.max_radius:
             if player.rect.x > self.rect.x:
                 self.rect.x += self.speed
             elif player.rect.x < self.rect.x:
@@ -266,22 +594,21 @@ class Enemy(pygame.sprite.Sprite):
                 self.rect.y += self.speed
             elif player.rect.y < self.rect.y:
                 self.rect.y -= self.speed
+        self.velocity = (self.rect.x - old_x, self.rect.y - old_y)
 
-        # If stuck on an obstacle, move away
-        for obstacle in obstacles:
-            if self.rect.colliderect(obstacle[1]):
-                if self.rect.x < obstacle[1].x:
-                    self.rect.x -= self.speed
-                elif self.rect.x > obstacle[1].x:
-                    self.rect.x += self.speed
-            
-                if self.rect.y < obstacle[1].y:
-                    self.rect.y -= self.speed
-                elif self.rect.y > obstacle[1].y:
-                    self.rect.y += self.speed
+        # If stuck on an obstacle, move away along the axis with the least
+        # overlap, out of the nearer side
+        for obstacle in colliding_obstacles(self.rect):
+            rect = obstacle[1]
+            left, right = self.rect.right - rect.left, rect.right - self.rect.left
+            up, down = self.rect.bottom - rect.top, rect.bottom - self.rect.top
+            if min(left, right) <= min(up, down):
+                self.rect.x += -self.speed if left < right else self.speed
+            else:
+                self.rect.y += -self.speed if up < down else self.speed
 
         # Avoid overlapping with other enemies
-        for other in enemies:
+        for other in nearby_enemies(self.rect):
             if other != self and self.rect.colliderect(other.rect):
                 if self.rect.x < other.rect.x:
                     self.rect.x -= self.speed
@@ -292,84 +619,512 @@ class Enemy(pygame.sprite.Sprite):
                     self.rect.y -= self.speed
                 else:
                     self.rect.y += self.speed
-        
-        self.update_animation()
+
+    # On the ticks between full updates, keep going the way the last one
+    # went, unless that runs into a tree: then stop until the next update
+    def coast(self):
+        if self.velocity == (0, 0):
+            return
+        if colliding_obstacles(self.rect.move(self.velocity)):
+            self.velocity = (0, 0)
+            return
+        self.rect.move_ip(self.velocity)
+
+# Enemy whose position, speed and health live in a Swarm; used only for drawing
+class SwarmEnemy(Enemy):
+    def __init__(self, x, y, slime_frames, swarm):
+        pygame.sprite.Sprite.__init__(self)
+        self.reset(x, y, slime_frames, swarm)
+
+    def reset(self, x, y, slime_frames, swarm):
+        self.clip = animation.clip(slime_frames, FRAME_TICKS)
+        self.phase = animation.tick
+        self.player_direction = 'right'
+        self.rect = self.image.get_rect()
+        self.rect.topleft = (x, y)
+
+        self.action_state = 'walking'
+
+        self.entity = None
+        self.swarm = swarm
+        self.initial_position = (x, y)
+        self.index = swarm.add(self, x, y, stats_rng.randint(*ENEMY_SPEED_RANGE), stats_rng.randint(600, 1000), 50)
+
+    @property
+    def health(self):
+        return self.swarm.health[self.index]
+
+    @health.setter
+    def health(self, value):
+        self.swarm.health[self.index] = value
+
+    @property
+    def speed(self):
+        return int(self.swarm.speed[self.index])
+
+    @property
+    def max_radius(self):
+        return int(self.swarm.max_radius[self.index])
+
+    # Movement is stepped for the whole swarm in update_enemies
+    def update(self, player):
+        pass
+
+# Slimes not in play, one pool per enemy class
+enemy_pools = {}
+
+def enemy_pool(kind):
+    pool = enemy_pools.get(kind)
+    if pool is None:
+        pool = enemy_pools[kind] = Pool(kind)
+    return pool
+
+# Put a level's slimes back in their pools at once (they are all of one
+# class unless the backend changed mid-level)
+def release_enemies(released):
+    for kind, group in groupby(released, type):
+        enemy_pool(kind).release_all(group)
+
+# Take a slime out of play: out of the registry and the drawn group, back
+# to its pool
+def despawn(enemy):
+    registry.destroy(enemy.entity)
+    enemy.entity = None
+    all_sprites.remove(enemy)
+    enemy_pool(type(enemy)).release(enemy)
+
+# Where a level's slimes start: clear of the trees and of each other, so
+# none start out being pushed apart. When the area has no room left for
+# that, the rest go anywhere in it.
+def generate_spawn_points(obstacles):
+    count = spawn_rng.randint(*ENEMY_COUNT_RANGE)
+    area = pygame.Rect(300, 100, WORLD_WIDTH - 400, WORLD_HEIGHT - 200)
+    sampler = PoissonDiskSampler(spawn_rng, area, *slime_frames['right'][0].get_size())
+    for obstacle in obstacles:
+        sampler.block(obstacle[1])
+    points = sampler.sample(count)
+    points += [(spawn_rng.randint(area.left, area.right), spawn_rng.randint(area.top, area.bottom)) for _ in range(count - len(points))]
+    return points
+
+# Set up the configured backend for a new level's slimes (the swarm's
+# arrays are reused)
+def prepare_enemy_backend():
+    global swarm
+    if ENEMY_BACKEND not in ("swarm", "shared"):
+        swarm = None
+        return
+    width, height = slime_frames['right'][0].get_size()
+    if swarm is None and ENEMY_BACKEND == "shared":
+        from engine.shared_swarm import SharedSwarm
+        swarm = SharedSwarm(width, height, SWARM_WORKERS)
+    elif swarm is None:
+        from engine.swarm import Swarm
+        swarm = Swarm(width, height)
+    else:
+        swarm.clear()
+
+# Put a slime in play at (x, y), reusing a pooled one if there is any
+def spawn_enemy(x, y):
+    if swarm is not None:
+        enemy = enemy_pool(SwarmEnemy).acquire(x, y, slime_frames, swarm)
+    else:
+        enemy = enemy_pool(Enemy).acquire(x, y, slime_frames)
+    enemy.entity = registry.create(enemy=enemy)
+    all_sprites.add(enemy)
+
+# Brings the level's waves of slimes in, a few ticks at a time if need be
+spawner = WaveSpawner(spawn_enemy, SPAWN_BUDGET_MS)
 
 # Castle class
 class Castle(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
-        castle_image = pygame.image.load("assets/castle/door.png").convert_alpha()
-        width, height = castle_image.get_width(), castle_image.get_height()
-        castle_image = pygame.transform.scale(castle_image, (width*2, height*2))
         self.image = castle_image
         # self.image.fill(WHITE)
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
 
+# Where the knight starts every level
+PLAYER_START = (100, 100)
+
+# Everything about a level that does not depend on how the last one was
+# played: trees, slime spawn points, and the collision index, flow field
+# and tile world built from the trees. generate_layout() makes one, on a
+# worker thread while the victory screen is up, and new_level() swaps it in
+# whole. Only the spawn, tree and tile random streams are used, in the same
+# order as when laying out in line, so a seed gives the same levels.
+class LevelLayout:
+    def __init__(self, obstacles, spawn_points, obstacle_grid, flow_field, world):
+        self.obstacles = obstacles
+        self.spawn_points = spawn_points
+        self.obstacle_grid = obstacle_grid
+        self.flow_field = flow_field
+        self.world = world
+
+# Lay out a level, reusing the indexes of spare (a layout no longer in play)
+def generate_layout(spare=None):
+    start = idle_frames['right'][0].get_rect(topleft=PLAYER_START)
+    obstacles = generate_obstacles(start)
+    spawn_points = generate_spawn_points(obstacles)
+    field = build_flow_field(obstacles, spare and spare.flow_field)
+    # The first search toward the knight is done here too
+    field.update(*start.center)
+    world = build_world(obstacles, spare and spare.world)
+    # And the chunks the camera starts on, so the level's first frame has
+    # none left to draw (a headless run draws nothing)
+    if not HEADLESS:
+        view = Camera(SCREEN_WIDTH, SCREEN_HEIGHT, WORLD_WIDTH, WORLD_HEIGHT)
+        view.follow(start.center)
+        world.prerender(view.rect)
+    return LevelLayout(obstacles, spawn_points,
+                       index_obstacles(obstacles, spare and spare.obstacle_grid),
+                       field, world)
+
+# Lays out the next level in the background
+level_worker = ThreadPoolExecutor(1, thread_name_prefix="level")
+
+# Entities in play. Each slime is an entity whose "enemy" component is its
+# sprite, which holds its position, health, animation and chase state (in
+# the swarm's arrays with that backend). The store keeps them packed, so
+# `enemies` is always the list of slimes in play: the per-tick systems loop
+# over it as is, and a slime joins or leaves it in O(1).
+registry = Registry()
+
+# Level state. The player, castle, sprite group, slimes (through their
+# pools) and the per-level indexes are made once and reset by new_level;
+# the layout before the current one is kept to be reused.
+player = None
+castle = None
+enemies = registry.store("enemy").values
+obstacles = []
+swarm_obstacles = []  # obstacles for the swarm backend, see solid_obstacles
+all_sprites = pygame.sprite.Group()
+layout = None
+spare_layout = None
+
+# The spare layout, for a generate_layout() call to reuse; the caller owns
+# it from then on
+def take_spare_layout():
+    global spare_layout
+    spare, spare_layout = spare_layout, None
+    return spare
+
+# Set up a level: the player back at the start (with boosted stats on level
+# up), enemies, trees, the tile world with its camera and the castle. The
+# layout is next_layout when given, else made now.
+# Returns the castle and the group of drawn sprites.
+def new_level(previous_player=None, next_layout=None):
+    global obstacles, swarm_obstacles, player, castle, obstacle_grid, flow_field, world, camera, layout, spare_layout
+    load_assets()
+    if next_layout is None:
+        next_layout = generate_layout(take_spare_layout())
+    if previous_player is None:
+        stats = ()
+    else:
+        stats = (previous_player.health * LEVEL_UP_MULTIPLIERS["health"],
+                 previous_player.attack_power * LEVEL_UP_MULTIPLIERS["attack_power"],
+                 previous_player.attack_range * LEVEL_UP_MULTIPLIERS["attack_range"],
+                 previous_player.speed * LEVEL_UP_MULTIPLIERS["speed"],
+                 previous_player.score + LEVEL_UP_SCORE_BONUS)
+    if player is None:
+        player = Player(*PLAYER_START, walking_frames, idle_frames, attack_frames, *stats)
+    else:
+        player.reset(*PLAYER_START, *stats)
+    release_enemies(enemies)
+    registry.clear()
+    ai.reset()
+    prepare_enemy_backend()
+    spawner.clear()
+    spawn_points = next_layout.spawn_points
+    for wave in range(ENEMY_WAVES):
+        points = spawn_points[len(spawn_points) * wave // ENEMY_WAVES:len(spawn_points) * (wave + 1) // ENEMY_WAVES]
+        spawner.add_wave(points, WAVE_DELAY if wave else 0)
+    if layout is not None:
+        spare_layout = layout
+    layout = next_layout
+    obstacles = layout.obstacles
+    swarm_obstacles = solid_obstacles(obstacles) if swarm is not None else []
+    obstacle_grid = layout.obstacle_grid
+    flow_field = layout.flow_field
+    world = layout.world
+    camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT, WORLD_WIDTH, WORLD_HEIGHT)
+    camera.follow(player.rect.center)
+    castle_position = (-15, 0) if previous_player is None else (WORLD_WIDTH - 100, WORLD_HEIGHT // 2 - 50)
+    if castle is None:
+        castle = Castle(*castle_position)
+    else:
+        castle.rect.topleft = castle_position
+    all_sprites.empty()
+    all_sprites.add(player)
+    return castle, all_sprites
+
+# Apply one tick's hit events together: a point per hit, and for the swarm
+# one array update for all the damage. Slimes killed leave play.
+def apply_hits(player, events):
+    if not events:
+        return
+    if swarm is not None:
+        swarm.damage([enemy.index for enemy, _ in events], [damage for _, damage in events])
+    else:
+        for enemy, damage in events:
+            enemy.health -= damage
+    player.score += len(events)
+    for enemy, _ in events:
+        if enemy.entity is not None and enemy.health <= 0:
+            despawn(enemy)
+
+# Advance the game by one tick. Returns "victory", "defeat" or None.
+def simulate_tick(keys, attack, all_sprites, castle):
+    animation.advance()
+    spawner.update()
+
+    # Update player
+    with profiler.scope("player"):
+        if attack:
+            player.attack()
+        player.update(keys)
+
+    # Update enemies
+    with profiler.scope("enemies"):
+        update_enemies(player)
+
+    with profiler.scope("collision"):
+        # Resolve the swing against the enemies where they are now; the
+        # ones it kills go back to their pools for the next wave
+        hits = []
+        player.strike(hits)
+        apply_hits(player, hits)
+        if swarm is not None:
+            swarm.remove_dead()
+
+        # Check victory condition
+        if player.rect.colliderect(castle.rect) and len(enemies) == 0 and not spawner.busy():
+            return "victory"
+
+        # Check game over condition
+        for enemy in nearby_enemies(player.rect):
+            if enemy.health > 0 and enemy.rect.colliderect(player.rect):
+                player.health -= 1
+                if player.health <= 0:
+                    return "defeat"
+    return None
+
+# Stand-in for pygame.key.get_pressed() when input comes from a policy
+class PolicyKeys:
+    def __init__(self, pressed=()):
+        self.pressed = set(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+# Simple bot for headless runs: walks to the nearest slime and swings at it,
+# then heads for the castle. Sidesteps for a while when a tree blocks it.
+class BotPolicy:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.last_position = None
+        self.stuck_ticks = 0
+        self.detour = None
+        self.detour_ticks = 0
+
+    def __call__(self, player, enemies, castle, tick):
+        px, py = player.rect.center
+        alive = [enemy for enemy in enemies if enemy.health > 0]
+        if alive:
+            target = min(alive, key=lambda enemy: (enemy.rect.centerx - px) ** 2 + (enemy.rect.centery - py) ** 2)
+            tx, ty = target.rect.center
+        else:
+            target = None
+            tx = min(max(px, castle.rect.left), castle.rect.right)
+            ty = min(max(py, castle.rect.top), castle.rect.bottom)
+        dx, dy = tx - px, ty - py
+
+        # Press one arrow at a time so the facing direction matches the swing
+        if abs(dx) > abs(dy):
+            key = pygame.K_RIGHT if dx > 0 else pygame.K_LEFT
+        else:
+            key = pygame.K_DOWN if dy > 0 else pygame.K_UP
+
+        if self.detour_ticks > 0:
+            self.detour_ticks -= 1
+            key = self.detour
+        elif player.rect.topleft == self.last_position:
+            self.stuck_ticks += 1
+            if self.stuck_ticks > 20:
+                sideways = (pygame.K_UP, pygame.K_DOWN) if key in (pygame.K_LEFT, pygame.K_RIGHT) else (pygame.K_LEFT, pygame.K_RIGHT)
+                self.detour = self.rng.choice(sideways)
+                self.detour_ticks = 40
+                self.stuck_ticks = 0
+        else:
+            self.stuck_ticks = 0
+        self.last_position = player.rect.topleft
+
+        in_range = target is not None and dx * dx + dy * dy < player.attack_range ** 2
+        attack = in_range and not player.attacking
+        return PolicyKeys([] if in_range else [key]), attack
+
+# Play without a window as fast as the CPU allows: one fixed tick per loop,
+# input from `policy` instead of the keyboard, no rendering. A run that
+# goes max_idle_ticks without the score changing or a level being cleared
+# (the bot stuck on a tree, say) ends as "stalled" rather than using up
+# max_ticks.
+def run_headless(policy=None, seed=None, max_levels=1, max_ticks=FPS * 60 * 10, max_idle_ticks=FPS * 60):
+    if seed is not None:
+        seed_rngs(seed)
+    if policy is None:
+        policy = BotPolicy(seed)
+
+    # How much AI and spawning fit in their time budgets depends on the
+    # machine; without the budgets a seed always plays out the same
+    budget, ai.budget = ai.budget, None
+    spawn_budget, spawner.budget = spawner.budget, None
+    castle, all_sprites = new_level()
+    outcome = "timeout"
+    levels_cleared = 0
+    damage_taken = 0
+    ticks = 0
+    last_score, progress_tick = player.score, 0
+    while ticks < max_ticks:
+        keys, attack = policy(player, enemies, castle, ticks)
+        health = player.health
+        result = simulate_tick(keys, attack, all_sprites, castle)
+        damage_taken += health - player.health
+        ticks += 1
+        if result == "defeat":
+            outcome = "defeat"
+            break
+        if result == "victory":
+            levels_cleared += 1
+            if levels_cleared >= max_levels:
+                outcome = "victory"
+                break
+            castle, all_sprites = new_level(player)
+            progress_tick = ticks
+        if player.score != last_score:
+            last_score, progress_tick = player.score, ticks
+        elif ticks - progress_tick >= max_idle_ticks:
+            outcome = "stalled"
+            break
+    ai.budget = budget
+    spawner.budget = spawn_budget
+
+    return {
+        "outcome": outcome,
+        "levels_cleared": levels_cleared,
+        "ticks": ticks,
+        "score": player.score,
+        "damage_taken": damage_taken,
+        "health": player.health,
+    }
+
+# Yellow outline showing where the last attack landed
+def attack_outline(attack_rect):
+    outline = pygame.Surface(attack_rect.size, pygame.SRCALPHA)
+    pygame.draw.rect(outline, YELLOW, outline.get_rect(), 1)
+    return outline
+
+# Draw sprites over the grass and trees, then the castle and HUD on top.
+# With positions given, sprites are drawn alpha of the way from where they
+# were before the last tick to where they are now. The camera follows the
+# player and only what it sees is drawn.
+def draw_frame(renderer, all_sprites, castle, health_label, score_label, positions=None, alpha=1.0):
+    x, y = player.rect.topleft if positions is None else positions.position(player, alpha)
+    if camera.follow((x + player.rect.width // 2, y + player.rect.height // 2)):
+        renderer.set_background(world.view(camera))
+    view = camera.rect
+    visible = view.inflate(32, 32)  # room for the distance moved since the last tick
+
+    sprites = []
+    for sprite in all_sprites:
+        if visible.colliderect(sprite.rect):
+            x, y = sprite.rect.topleft if positions is None else positions.position(sprite, alpha)
+            offset_x, offset_y = sprite.image_offset
+            sprites.append((sprite.image, (x - view.x + offset_x, y - view.y + offset_y)))
+    if player.attack_rect is not None:
+        sprites.append((attack_outline(player.attack_rect), camera.to_screen(player.attack_rect)))
+        player.attack_rect = None
+    overlays = []
+    if camera.visible(castle.rect):
+        overlays.append((castle.image, camera.to_screen(castle.rect)))
+    overlays += [
+        (health_label.render(player.health), (10, 10)),
+        (score_label.render(player.score), (10, 40)),
+    ]
+    profiler_overlay = profiler.overlay(SCREEN_WIDTH)
+    if profiler_overlay is not None:
+        overlays.append(profiler_overlay)
+    renderer.draw(sprites, overlays)
+
 # Game loop
 def main():
-    global enemies, obstacles, player
+    init_display()
+    font = text_renderer.get_font(None, 30, sysfont=True)
+    health_label = TextLabel(text_renderer, "Health: {}", font, WHITE)
+    score_label = TextLabel(text_renderer, "Your Score: {}", font, WHITE)
+    # The background is the level's tile world, set when a level starts
+    if RENDER_MODE == "dirty":
+        renderer = DirtyRenderer(screen, None)
+    else:
+        renderer = FullRenderer(screen, None)
+    # Game logic runs at FPS ticks per second whatever the frame rate
+    loop = FixedTimestep(FPS)
+    positions = InterpolatedSprites()
     running = True
     game_start = True
     game_over = False
     level_up = False
+    attack = False
 
     while running:
         if game_start:
-            player = Player(100, 100, walking_frames, idle_frames, attack_frames)
-            enemies = pygame.sprite.Group([Enemy(random.randint(300, 700), random.randint(100, 500), slime_frames) for _ in range(random.randint(3, 20))])
-            obstacles = generate_obstacles()
-            castle = Castle(-15, 0)
-            all_sprites = pygame.sprite.Group()
-            all_sprites.add(player)
-            all_sprites.add(enemies)
+            castle, all_sprites = new_level()
+            renderer.set_background(world.view(camera))
+            positions.clear()
+            loop.reset()
             game_start = False
 
         elif level_up:
-            player = Player(100, 100, walking_frames, idle_frames, attack_frames, player.health * 1.20, player.attack_power * 1.10, player.attack_range * 1.20, player.speed * 1.1, player.score + 50)
-            enemies = pygame.sprite.Group([Enemy(random.randint(300, 700), random.randint(100, 500), slime_frames) for _ in range(random.randint(3, 20))])
-            obstacles = generate_obstacles()
-            castle = Castle(700, 250)
-            all_sprites = pygame.sprite.Group()
-            all_sprites.add(player)
-            all_sprites.add(enemies)
+            castle, all_sprites = new_level(player, next_layout.result())
+            renderer.set_background(world.view(camera))
+            positions.clear()
+            loop.reset()
             level_up = False
 
-        # screen.fill(BLACK)
-        screen.blit(background_image, (0, 0)) 
-        keys = pygame.key.get_pressed()
-
-        # Event handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_a:  # Attack with 'A'
-                    player.attack(enemies)
-
-        # Update player
-        player.update(keys)
+        with profiler.scope("input"):
+            # Sounds still loading in the background
+            loader.poll()
+            keys = pygame.key.get_pressed()
 
-        # Update enemies
-        for enemy in enemies:
-            enemy.update(player)
+            # Event handling. An attack press waits for the next tick.
+            for event in pygame.event.get():
+                profiler.handle_event(event)
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_a:  # Attack with 'A'
+                        attack = True
 
-        # Remove dead enemies
-        enemies = [enemy for enemy in enemies if enemy.health > 0]
-        all_sprites.remove(*[enemy for enemy in all_sprites if enemy.health <= 0])
+        outcome = None
+        for _ in range(loop.advance(clock.tick(FPS) / 1000)):
+            positions.save(all_sprites)
+            outcome = simulate_tick(keys, attack, all_sprites, castle)
+            attack = False
+            if outcome is not None:
+                break
 
-        # Check victory condition
-        if player.rect.colliderect(castle.rect) and len(enemies) == 0:
+        # Victory screen
+        if outcome == "victory":
             print("Victory! You captured the castle.")
+            # Lay out the next level while the player looks at this screen
+            next_layout = level_worker.submit(generate_layout, take_spare_layout())
             victory = True
             while victory:
                 screen.fill(WHITE)
-                victory_text = font.render("You captured the castle! Victory!", True, BLACK)
+                victory_text = text_renderer.render("You captured the castle! Victory!", font, BLACK)
                 screen.blit(victory_text, (SCREEN_WIDTH // 2 - victory_text.get_width() // 2, SCREEN_HEIGHT // 2 - victory_text.get_height() // 2))
-                score_text = font.render(f"Your Score: {player.score}", True, BLACK)
+                score_text = text_renderer.render(f"Your Score: {player.score}", font, BLACK)
                 screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, SCREEN_HEIGHT // 2 - score_text.get_height() // 2 + 50))
-                restart_text = font.render("Press C to Continue or Q to Quit", True, BLACK)
+                restart_text = text_renderer.render("Press C to Continue or Q to Quit", font, BLACK)
                 screen.blit(restart_text, (SCREEN_WIDTH // 2 - restart_text.get_width() // 2, SCREEN_HEIGHT // 2 - restart_text.get_height() // 2 + 100))
                 pygame.display.flip()
                 clock.tick(FPS)
@@ -386,59 +1141,80 @@ def main():
                         elif event.key == pygame.K_q:
                             victory = False
                             running = False
+            renderer.invalidate()
 
-        # Draw obstacles
-        for obstacle in obstacles:
-            screen.blit(obstacle[0], obstacle[1])
+        # Game over screen
+        elif outcome == "defeat":
+            print("Defeat! Jon Snow has fallen.")
+            game_over = True
+            while game_over:
+                screen.fill(BLACK)
+                score_text = text_renderer.render(f"Your Score: {player.score}", font, WHITE)
+                screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, SCREEN_HEIGHT // 2 - score_text.get_height() // 2))
+                game_over_text = text_renderer.render("Game Over! Press R to Restart or Q to Quit", font, WHITE)
+                screen.blit(game_over_text, (SCREEN_WIDTH // 2 - game_over_text.get_width() // 2, SCREEN_HEIGHT // 2 - game_over_text.get_height() // 2 + 50))
+                pygame.display.flip()
+                clock.tick(FPS)
 
-        all_sprites.draw(screen)
-        screen.blit(castle.image, castle.rect)
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        game_over = False
+                        running = False
 
-        # Display health
-        font = pygame.font.SysFont(None, 30)
-        health_text = font.render(f"Health: {player.health}", True, WHITE)
-        screen.blit(health_text, (10, 10))
+                    if event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_r:
+                            game_start = True
+                            game_over = False
 
-        # Display score
-        score_text = font.render(f"Your Score: {player.score}", True, WHITE)
-        screen.blit(score_text, (10, 40))
+                        elif event.key == pygame.K_q:
+                            game_over = False
+                            running = False
+            renderer.invalidate()
 
-        # Check game over condition
-        for enemy in enemies:
-            if enemy.rect.colliderect(player.rect):
-                player.health -= 1
-                if player.health <= 0:
-                    print("Defeat! Jon Snow has fallen.")
-                    game_over = True
-                    while game_over:
-                        screen.fill(BLACK)
-                        score_text = font.render(f"Your Score: {player.score}", True, WHITE)
-                        screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, SCREEN_HEIGHT // 2 - score_text.get_height() // 2))
-                        game_over_text = font.render("Game Over! Press R to Restart or Q to Quit", True, WHITE)
-                        screen.blit(game_over_text, (SCREEN_WIDTH // 2 - game_over_text.get_width() // 2, SCREEN_HEIGHT // 2 - game_over_text.get_height() // 2 + 50))
-                        pygame.display.flip()
-                        clock.tick(FPS)
-
-                        for event in pygame.event.get():
-                            if event.type == pygame.QUIT:
-                                game_over = False
-                                running = False
-
-                            if event.type == pygame.KEYDOWN:
-                                if event.key == pygame.K_r:
-                                    game_start = True
-                                    game_over = False
-
-                                elif event.key == pygame.K_q:
-                                    game_over = False
-                                    running = False
-                        
-                        
-
-        # Update screen
-        pygame.display.flip()
-        clock.tick(FPS)
+        # Draw between the last two ticks; when frames fall behind some are
+        # not drawn at all so the game keeps its pace
+        if loop.should_render():
+            with profiler.scope("draw"):
+                draw_frame(renderer, all_sprites, castle, health_label, score_label, positions, loop.alpha)
+
+            # Update screen
+            with profiler.scope("flip"):
+                renderer.present()
+                startup.first_frame()
+        profiler.end_frame()
+
+
+# Command line entry point
+def run(argv=None):
+    global HEADLESS, ENEMY_BACKEND, SWARM_WORKERS
+    parser = argparse.ArgumentParser(description="Battle of Bastards")
+    parser.add_argument("--headless", action="store_true", help="simulate without a window, using a bot for input")
+    parser.add_argument("--seed", type=int, help="seed for enemy spawns, stats and trees")
+    parser.add_argument("--levels", type=int, default=1, help="levels to play in headless mode")
+    parser.add_argument("--ticks", type=int, default=FPS * 60 * 10, help="tick limit in headless mode")
+    parser.add_argument("--backend", choices=["sprites", "swarm", "shared"], help="enemy simulation backend")
+    parser.add_argument("--workers", type=int, help="worker processes for the shared backend (default: one per core)")
+    parser.add_argument("--build-bundle", action="store_true", help=f"write {ASSET_BUNDLE} and exit")
+    args = parser.parse_args(argv)
+
+    if args.headless and not HEADLESS:
+        HEADLESS = True
+        startup.use_dummy_drivers()
+    if args.backend:
+        ENEMY_BACKEND = args.backend
+    if args.workers:
+        SWARM_WORKERS = args.workers
+    if args.build_bundle:
+        load_assets()
+        save_bundle(ASSET_BUNDLE, assets)
+        print(f"Wrote {ASSET_BUNDLE}: {len(assets.entries)} entries, {os.path.getsize(ASSET_BUNDLE)} bytes")
+    elif args.headless:
+        print(run_headless(seed=args.seed, max_levels=args.levels, max_ticks=args.ticks))
+    else:
+        if args.seed is not None:
+            seed_rngs(args.seed)
+        main()
 
 
 if __name__ == "__main__":
-    main()
+    run()
@@ -1,8 +1,8 @@
 import pygame
 import sys
 
-# Initialize Pygame
-pygame.init()
+from engine import startup
+from engine.assets import AssetManager
 
 # Screen dimensions
 SCREEN_WIDTH = 800
@@ -14,61 +14,72 @@ WHITE = (255, 255, 255)
 # Frame rate
 FPS = 5
 
-# Load the sprite sheet
-SPRITE_SHEET_PATH = "assets/knight/attack.png"  # Replace with your sprite sheet path
-
-# Sprite details
-SPRITE_COLUMNS = 10
+# Sprite sheets to look at: (path, columns, frame width, frame height).
+# Press SPACE or the right arrow for the next sheet, left arrow for the previous one.
+SPRITE_SHEETS = [
+    ("assets/knight/attack.png", 10, 80, 42),
+    ("assets/knight/attack_old.png", 10, 80, 80),
+    ("assets/knight/walking.png", 8, 42, 42),
+    ("assets/knight/idle.png", 4, 42, 42),
+    ("assets/knight/block.png", 7, 42, 42),
+    ("assets/knight/death.png", 9, 42, 42),
+]
 SPRITE_ROWS = 1
-SPRITE_WIDTH = 80  # Replace with the width of a single sprite
-SPRITE_HEIGHT = 80  # Replace with the height of a single sprite
-
-# Initialize the screen
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Sprite Animation")
-
-# Load the sprite sheet
-sprite_sheet = pygame.image.load(SPRITE_SHEET_PATH).convert_alpha()
-
-# Function to extract frames from the sprite sheet
-def load_frames(sprite_sheet, columns, rows, width, height):
-    frames = []
-    for col in range(columns):
-        x = col * width
-        y = 0  
-        frame = sprite_sheet.subsurface((x, y, width, height))
-        frames.append(frame)
-    return frames
-
-# Extract frames
-frames = load_frames(sprite_sheet, SPRITE_COLUMNS, SPRITE_ROWS, SPRITE_WIDTH, SPRITE_HEIGHT)
-
-# Game loop variables
-clock = pygame.time.Clock()
-current_frame = 0
-running = True
-
-while running:
-    # Handle events
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-    # Update frame index
-    current_frame = (current_frame + 1) % len(frames)
-
-    # Clear the screen
-    screen.fill(WHITE)
-
-    # Draw the current frame
-    screen.blit(frames[current_frame], (SCREEN_WIDTH // 2 - SPRITE_WIDTH // 2, SCREEN_HEIGHT // 2 - SPRITE_HEIGHT // 2))
-
-    # Update the display
-    pygame.display.flip()
-
-    # Control the frame rate
-    clock.tick(FPS)
-
-# Quit Pygame
-pygame.quit()
-sys.exit()
+
+# Sheets are decoded and cut into frames once, through the shared cache
+assets = AssetManager()
+
+# Open the window and cycle through the sheets until it is closed
+def run():
+    # Initialize the screen
+    screen = startup.display((SCREEN_WIDTH, SCREEN_HEIGHT), "Sprite Animation")
+
+    # Load every sheet and extract its frames
+    sheet_frames = []
+    for path, columns, width, height in SPRITE_SHEETS:
+        sheet_frames.append(assets.frames(path, columns, width, height, SPRITE_ROWS))
+
+    # Game loop variables
+    clock = pygame.time.Clock()
+    current_sheet = 0
+    frames = sheet_frames[current_sheet]
+    current_frame = 0
+    running = True
+
+    while running:
+        # Handle events
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key in (pygame.K_SPACE, pygame.K_RIGHT):
+                    current_sheet = (current_sheet + 1) % len(sheet_frames)
+                elif event.key == pygame.K_LEFT:
+                    current_sheet = (current_sheet - 1) % len(sheet_frames)
+                frames = sheet_frames[current_sheet]
+                current_frame = 0
+
+        # Update frame index
+        current_frame = (current_frame + 1) % len(frames)
+
+        # Clear the screen
+        screen.fill(WHITE)
+
+        # Draw the current frame
+        frame = frames[current_frame]
+        screen.blit(frame, (SCREEN_WIDTH // 2 - frame.get_width() // 2, SCREEN_HEIGHT // 2 - frame.get_height() // 2))
+
+        # Update the display
+        pygame.display.flip()
+        startup.first_frame()
+
+        # Control the frame rate
+        clock.tick(FPS)
+
+    # Quit Pygame
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    run()
+    sys.exit()
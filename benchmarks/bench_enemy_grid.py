@@ -0,0 +1,77 @@
+# Frame time vs. enemy count for the castle game's enemy update,
+# with the spatial grid ("after") and with plain linear scans ("before").
+#
+# Run from the repository root:
+#     python benchmarks/bench_enemy_grid.py
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import a7_got_attack_on_castle as game
+game.load_assets()
+from engine.scheduler import AIScheduler
+
+ENEMY_COUNTS = [10, 100, 500, 1000, 2000, 5000, 10000]
+LINEAR_LIMIT = 2000  # the O(n^2) path takes minutes per frame above this
+FRAMES = 20
+
+
+# Spread enemies over an area that keeps the density of a normal level
+def setup(count, seed=0):
+    # The game's own random streams: slime stats, trees and spawns
+    game.seed_rngs(seed)
+    side = max(1, int((count / 10) ** 0.5))
+    width, height = 400 * side, 400 * side
+    game.player = game.Player(width // 2, height // 2, game.walking_frames, game.idle_frames, game.attack_frames)
+    game.obstacles = game.generate_obstacles()
+    rng = game.spawn_rng
+    game.enemies = [game.Enemy(rng.randint(0, width), rng.randint(0, height), game.slime_frames) for _ in range(count)]
+    # Every slime updates every tick: no level of detail and no AI budget,
+    # which would cut the measured work short
+    game.ai = AIScheduler(lambda enemy, player: 1)
+
+
+# One frame of simulation: enemy update plus the player-contact loop
+def frame():
+    player = game.player
+    game.update_enemies(player)
+    for enemy in game.nearby_enemies(player.rect):
+        if enemy.health > 0 and enemy.rect.colliderect(player.rect):
+            pass
+
+
+def measure(count, use_grid):
+    setup(count)
+    if use_grid:
+        game.enemy_grid = game.SpatialGrid(game.GRID_CELL_SIZE)
+        game.obstacle_grid = game.index_obstacles(game.obstacles)
+    else:
+        game.enemy_grid = None
+        game.obstacle_grid = None
+
+    frame()  # warm up
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        frame()
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+
+def main():
+    print(f"{'enemies':>8} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}")
+    for count in ENEMY_COUNTS:
+        after = measure(count, use_grid=True)
+        if count <= LINEAR_LIMIT:
+            before = measure(count, use_grid=False)
+            print(f"{count:>8} {before:>12.2f} {after:>11.2f} {before / after:>7.1f}x")
+        else:
+            print(f"{count:>8} {'skipped':>12} {after:>11.2f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
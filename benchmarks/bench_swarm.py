@@ -0,0 +1,68 @@
+# Frame time vs. enemy count for the two enemy backends of the castle game:
+# per-object Enemy sprites (with the spatial grid) and the NumPy swarm.
+#
+# Run from the repository root:
+#     python benchmarks/bench_swarm.py
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import a7_got_attack_on_castle as game
+game.load_assets()
+from engine.scheduler import AIScheduler
+from engine.swarm import Swarm
+
+ENEMY_COUNTS = [100, 1000, 10000, 50000]
+SPRITES_LIMIT = 10000
+FRAMES = 20
+
+
+def setup(count, backend, seed=0):
+    # The game's own random streams: slime stats, trees and spawns
+    game.seed_rngs(seed)
+    side = max(1, int((count / 10) ** 0.5))
+    width, height = 400 * side, 400 * side
+    game.player = game.Player(width // 2, height // 2, game.walking_frames, game.idle_frames, game.attack_frames)
+    game.obstacles = game.generate_obstacles()
+    game.obstacle_grid = game.index_obstacles(game.obstacles)
+    game.swarm_obstacles = game.solid_obstacles(game.obstacles)
+    # Every slime updates every tick: no level of detail and no AI budget,
+    # which would cut the measured work short
+    game.ai = AIScheduler(lambda enemy, player: 1)
+    rng = game.spawn_rng
+    positions = [(rng.randint(0, width), rng.randint(0, height)) for _ in range(count)]
+    if backend == "swarm":
+        game.swarm = Swarm(game.slime_frames['right'][0].get_width(), game.slime_frames['right'][0].get_height())
+        game.enemies = [game.SwarmEnemy(x, y, game.slime_frames, game.swarm) for x, y in positions]
+    else:
+        game.swarm = None
+        game.enemies = [game.Enemy(x, y, game.slime_frames) for x, y in positions]
+
+
+def measure(count, backend):
+    setup(count, backend)
+    game.update_enemies(game.player)  # warm up
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        game.update_enemies(game.player)
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+
+def main():
+    print(f"{'enemies':>8} {'sprites (ms)':>13} {'swarm (ms)':>11}")
+    for count in ENEMY_COUNTS:
+        swarm_ms = measure(count, "swarm")
+        if count <= SPRITES_LIMIT:
+            print(f"{count:>8} {measure(count, 'sprites'):>13.2f} {swarm_ms:>11.2f}")
+        else:
+            print(f"{count:>8} {'skipped':>13} {swarm_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# Frame-time benchmark suite.
+# Drives the games headless with scripted input and reports the frame-time
+# distribution and simulated ticks per second of each scenario. Every run is
+# appended to benchmarks/results/history.jsonl and compared with the previous
+# one; scenarios that got slower by more than the threshold are flagged and
+# the exit code is 1.
+#
+# Run from anywhere:
+#     python benchmarks/run_suite.py                       # every scenario
+#     python benchmarks/run_suite.py a7_slimes_1000 a5_full_force
+#     python benchmarks/run_suite.py --frames 600 --threshold 0.15
+#     python benchmarks/run_suite.py --list
+#
+# Each scenario runs in its own process, so module state and pygame setup
+# never leak from one scenario into the next. Clocks are replaced so frames
+# run as fast as they can; the first --warmup frames are not measured.
+#
+# ticks_per_sec is how many game ticks run per second of wall time: for the
+# castle game that is simulate_tick alone (what a headless run gets), for the
+# other scripts, which update and draw in one loop, it is whole frames.
+# startup_ms is the time from the scenario starting (before the game is
+# imported) to its first presented frame. For the castle game,
+# ai_budget_used is the mean fraction of the slimes' AI time budget a tick
+# used (saved with the results, not printed).
+import argparse
+import contextlib
+import json
+import os
+import platform
+import runpy
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_PATH = os.path.join(ROOT, "benchmarks", "results", "history.jsonl")
+
+# name -> (runner, options). "frames" and "warmup" override the defaults for
+# scenarios too slow to run 300 frames of.
+SCENARIOS = {
+    "a7_slimes_10": ("a7", {"slimes": 10}),
+    "a7_slimes_100": ("a7", {"slimes": 100}),
+    "a7_slimes_1000": ("a7", {"slimes": 1000}),
+    "a7_slimes_10000": ("a7", {"slimes": 10000, "frames": 20, "warmup": 5}),
+    "a7_swarm_10000": ("a7", {"slimes": 10000, "backend": "swarm", "frames": 60}),
+    "a7_shared_10000": ("a7", {"slimes": 10000, "backend": "shared", "frames": 60}),
+    "a7_attack_mash": ("a7", {"slimes": 100, "attack": True}),
+    "a7_spawn_5000": ("a7", {"slimes": 5000, "backend": "swarm", "world_scale": 150, "spawn_all": False, "frames": 60, "warmup": 0}),
+    "a7_world_50x": ("a7", {"slimes": 100, "world_scale": 50}),
+    "a7_trees_40": ("a7", {"slimes": 100, "trees": 40}),
+    "a5_full_force": ("a5", {}),
+    "a8_sheet_cycle": ("a8", {}),
+}
+
+
+class _ScenarioDone(Exception):
+    pass
+
+
+# Stands in for pygame.time.Clock so loops are not throttled
+class BenchClock:
+    def __init__(self, *args):
+        pass
+
+    def tick(self, framerate=0):
+        return 16
+
+    tick_busy_loop = tick
+
+    def get_fps(self):
+        return 0.0
+
+
+def summarize(frame_times, tick_times):
+    from engine.profiler import percentile
+    values = sorted(frame_times)
+    return {
+        "frames": len(values),
+        "mean_ms": sum(values) / len(values) * 1000,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": values[-1] * 1000,
+        "ticks_per_sec": len(tick_times) / sum(tick_times),
+    }
+
+
+# Castle game: one level with a fixed number of slimes, in a world
+# world_scale times the screen's area with `trees` trees per screen. The
+# knight walks a square and cannot die, so every scenario runs its full
+# number of frames. The slimes are all in play before the first frame
+# unless spawn_all is False, which measures them coming in. Headless mode
+# loads no sounds, so with attack set the mixer is started (on the dummy
+# audio driver) and the attack sound loaded here, and every swing plays it.
+def run_a7(frames, warmup, slimes, backend="sprites", attack=False, world_scale=1, trees=None, spawn_all=True):
+    os.environ["A7_HEADLESS"] = "1"
+    import a7_got_attack_on_castle as game
+    from engine import startup
+    from engine.render import FullRenderer
+    from engine.text import TextLabel
+
+    game.ENEMY_BACKEND = backend
+    game.ENEMY_COUNT_RANGE = (slimes, slimes)
+    game.WORLD_WIDTH = round(game.SCREEN_WIDTH * world_scale ** 0.5)
+    game.WORLD_HEIGHT = round(game.SCREEN_HEIGHT * world_scale ** 0.5)
+    if trees is not None:
+        game.TREES_PER_SCREEN = trees
+    if attack:
+        if not startup.mixer():
+            raise RuntimeError("attack scenario needs a mixer (SDL_AUDIODRIVER=dummy will do)")
+        game.set_attack_sound(game.pygame.mixer.Sound(game.ATTACK_SOUND_PATH))
+    game.seed_rngs(0)
+    font = game.text_renderer.get_font(None, 30, sysfont=True)
+    health_label = TextLabel(game.text_renderer, "Health: {}", font, game.WHITE)
+    score_label = TextLabel(game.text_renderer, "Your Score: {}", font, game.WHITE)
+    walk = [game.pygame.K_RIGHT, game.pygame.K_DOWN, game.pygame.K_LEFT, game.pygame.K_UP]
+
+    def start_level():
+        castle, all_sprites = game.new_level()
+        if spawn_all:
+            game.spawner.flush()
+        game.player.health = float("inf")
+        return castle, all_sprites, FullRenderer(game.screen, game.world.view(game.camera))
+
+    castle, all_sprites, renderer = start_level()
+    frame_times, tick_times, ai_usage = [], [], []
+    for frame in range(warmup + frames):
+        keys = game.PolicyKeys([walk[frame // 60 % 4]])
+        start = time.perf_counter()
+        outcome = game.simulate_tick(keys, attack, all_sprites, castle)
+        ticked = time.perf_counter()
+        if outcome == "victory":
+            castle, all_sprites, renderer = start_level()
+        game.draw_frame(renderer, all_sprites, castle, health_label, score_label)
+        renderer.present()
+        startup.first_frame()
+        end = time.perf_counter()
+        if frame >= warmup:
+            frame_times.append(end - start)
+            tick_times.append(ticked - start)
+            if game.swarm is None and game.ai.budget is not None:
+                ai_usage.append(game.ai.usage())
+    result = summarize(frame_times, tick_times)
+    if ai_usage:
+        result["ai_budget_used"] = sum(ai_usage) / len(ai_usage)
+    return result
+
+
+# Runs a top-level script with scripted events and keys. A frame ends at each
+# display flip/update; the script is stopped by raising out of that call.
+def run_script(path, frames, warmup, events=None, held_keys=()):
+    import pygame
+
+    flips = []
+    frame = [0]
+    real_get, real_flip, real_update = pygame.event.get, pygame.display.flip, pygame.display.update
+
+    def scripted_get(*args, **kwargs):
+        real_get()
+        frame[0] += 1
+        return events(frame[0]) if events else []
+
+    def end_frame():
+        flips.append(time.perf_counter())
+        if len(flips) > warmup + frames:
+            raise _ScenarioDone()
+
+    def flip():
+        real_flip()
+        end_frame()
+
+    def update(*args):
+        real_update(*args)
+        end_frame()
+
+    class HeldKeys:
+        def __getitem__(self, key):
+            return key in held_keys
+
+    pygame.event.get = scripted_get
+    pygame.key.get_pressed = HeldKeys
+    pygame.time.Clock = BenchClock
+    pygame.display.flip = flip
+    pygame.display.update = update
+    try:
+        runpy.run_path(os.path.join(ROOT, path), run_name="__main__")
+    except (_ScenarioDone, SystemExit):
+        pass
+    frame_times = [end - start for start, end in zip(flips[warmup:], flips[warmup + 1:])]
+    return summarize(frame_times, frame_times)
+
+
+def key_event(key, unicode=""):
+    import pygame
+    return pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode, mod=0, scancode=0)
+
+
+# Doging Rally: enter two names, then both players push in every direction
+def run_a5(frames, warmup):
+    import pygame
+    name_entry = {
+        1: [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(210, 210), button=1)],
+        2: [key_event(pygame.K_a, "A")],
+        3: [key_event(pygame.K_RETURN, "\r")],
+        4: [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(210, 310), button=1)],
+        5: [key_event(pygame.K_b, "B")],
+        6: [key_event(pygame.K_RETURN, "\r")],
+    }
+    held = {pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d, pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT}
+    return run_script("a5_doging_rally.py", frames, warmup, lambda frame: name_entry.get(frame, []), held)
+
+
+# Sprite viewer: switch to the next sheet every 10 frames
+def run_a8(frames, warmup):
+    import pygame
+    return run_script("a8_sprites_eda.py", frames, warmup, lambda frame: [key_event(pygame.K_SPACE, " ")] if frame % 10 == 0 else [])
+
+
+RUNNERS = {"a7": run_a7, "a5": run_a5, "a8": run_a8}
+
+
+# Child process: run one scenario and print its result as JSON on the last line
+def run_one(name, frames, warmup):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from engine import startup  # starts the startup clock
+    runner, options = SCENARIOS[name]
+    options = dict(options)
+    default_frames = options.pop("frames", 300)
+    default_warmup = options.pop("warmup", 30)
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+        result = RUNNERS[runner](frames or default_frames, default_warmup if warmup is None else warmup, **options)
+    if startup.first_frame_time is not None:
+        result["startup_ms"] = startup.first_frame_time * 1000
+    print(json.dumps(result))
+
+
+def run_scenario(name, frames, warmup):
+    command = [sys.executable, os.path.abspath(__file__), "--child", name]
+    if frames is not None:
+        command += ["--frames", str(frames)]
+    if warmup is not None:
+        command += ["--warmup", str(warmup)]
+    output = subprocess.run(command, capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+# Worse p95 frame time or fewer ticks per second than the baseline by more
+# than the threshold (a fraction) counts as a regression
+def regressions(current, baseline, threshold):
+    flagged = {}
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        reasons = []
+        if result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            reasons.append(f"p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        if result["ticks_per_sec"] < before["ticks_per_sec"] * (1 - threshold):
+            reasons.append(f"ticks/s {before['ticks_per_sec']:.0f} -> {result['ticks_per_sec']:.0f}")
+        if reasons:
+            flagged[name] = reasons
+    return flagged
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Frame-time benchmarks for the games in this folder")
+    parser.add_argument("scenarios", nargs="*", help="scenarios to run (default: all)")
+    parser.add_argument("--frames", type=int, help="measured frames per scenario (default: 300, less for the largest)")
+    parser.add_argument("--warmup", type=int, help="frames run before measuring (default: 30)")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression, e.g. 0.10 for 10%%")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON lines file the results are appended to")
+    parser.add_argument("--no-save", action="store_true", help="compare only, do not append this run to the history")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        run_one(args.child, args.frames, args.warmup)
+        return 0
+    if args.list:
+        print("\n".join(SCENARIOS))
+        return 0
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}. Use --list to see them.")
+        return 2
+
+    history = load_history(args.history)
+    # Latest earlier result of each scenario
+    baseline = {}
+    for run in history:
+        baseline.update(run["scenarios"])
+
+    print(f"{'scenario':<18} {'frames':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'ticks/s':>9} {'startup':>8}")
+    results = {}
+    for name in names:
+        result = results[name] = run_scenario(name, args.frames, args.warmup)
+        print(f"{name:<18} {result['frames']:>6} {result['mean_ms']:>8.2f} {result['p50_ms']:>8.2f} "
+              f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['ticks_per_sec']:>9.0f} {result.get('startup_ms', 0):>8.1f}")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        run = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "scenarios": results,
+        }
+        with open(args.history, "a") as file:
+            file.write(json.dumps(run) + "\n")
+
+    flagged = regressions(results, baseline, args.threshold)
+    for name, reasons in flagged.items():
+        print(f"REGRESSION {name}: {'; '.join(reasons)}")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
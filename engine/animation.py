@@ -0,0 +1,59 @@
+# Shared animation clock.
+# A clip is an animation (frames per direction, shown for frame_ticks ticks
+# each) that every sprite playing it shares. The clock advances each clip
+# once per tick; a sprite keeps only its clip and the tick it started
+# playing it (its phase), and reads its current image from the clip with
+# one table lookup. Sprites that share a clip and phase share the lookup,
+# and nothing is done per sprite on a tick, so the cost of animating grows
+# with the number of clips, not the number of sprites.
+#
+#     clock = AnimationClock()
+#     clip = clock.clip(slime_frames, 10)
+#     phase = clock.tick  # when a slime starts playing the clip
+#     clock.advance()  # once per tick
+#     image = clip.image('right', phase)
+
+
+class Clip:
+    def __init__(self, frames, frame_ticks):
+        self.frames = frames
+        self.frame_ticks = frame_ticks
+        self.length = len(next(iter(frames.values())))
+        self.period = frame_ticks * self.length
+        # direction -> the image shown on each tick of one cycle
+        self.timeline = {
+            direction: [frame for frame in direction_frames for _ in range(frame_ticks)]
+            for direction, direction_frames in frames.items()
+        }
+        self.position = 0  # the clock's tick within the cycle
+
+    def advance(self, tick):
+        self.position = tick % self.period
+
+    # Frame number for a sprite that started the clip on tick `phase`
+    def frame(self, phase):
+        return (self.position - phase) % self.period // self.frame_ticks
+
+    def image(self, direction, phase):
+        return self.timeline[direction][(self.position - phase) % self.period]
+
+
+class AnimationClock:
+    def __init__(self):
+        self.tick = 0
+        self.clips = {}  # (id of the frames, frame_ticks) -> Clip
+
+    # The clip playing `frames`, made on first use and shared after that
+    def clip(self, frames, frame_ticks):
+        key = (id(frames), frame_ticks)
+        clip = self.clips.get(key)
+        if clip is None or clip.frames is not frames:
+            clip = self.clips[key] = Clip(frames, frame_ticks)
+            clip.advance(self.tick)
+        return clip
+
+    # Move every clip on by one tick
+    def advance(self):
+        self.tick += 1
+        for clip in self.clips.values():
+            clip.advance(self.tick)
@@ -0,0 +1,133 @@
+# Shared cache of decoded images.
+# Every image is decoded from disk once, and each variant (scaled, flipped,
+# converted for the display, cut into sprite-sheet frames) is made once from
+# that, keyed by how it was made. Everyone asking for the same key gets the
+# same surface, so callers must not draw on what they get back. The cache
+# keeps at most `budget` bytes of pixels and drops the least recently used
+# entries beyond that; a dropped surface stays alive as long as a caller
+# still holds it, and is made again the next time it is asked for. With a
+# bundle (engine.bundle) set, entries it holds are taken from it instead of
+# being decoded. engine.loader fills the cache from worker threads.
+from collections import OrderedDict
+
+import pygame
+
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+def entry_bytes(entry):
+    if isinstance(entry, list):
+        return sum(surface_bytes(surface) for surface in entry)
+    return surface_bytes(entry)
+
+
+# surface scaled by a factor or to a (width, height) size, mirrored
+# left-right when flip is set
+def transformed(surface, scale=1, flip=False):
+    if scale != 1:
+        if isinstance(scale, tuple):
+            size = scale
+        else:
+            size = (round(surface.get_width() * scale), round(surface.get_height() * scale))
+        surface = pygame.transform.scale(surface, size)
+    if flip:
+        surface = pygame.transform.flip(surface, True, False)
+    return surface
+
+
+# convert is "alpha" (per-pixel alpha), "opaque" or None (as decoded)
+def converted(surface, convert):
+    if convert == "alpha":
+        return surface.convert_alpha()
+    if convert == "opaque":
+        return surface.convert()
+    return surface
+
+
+# Frames of a sprite sheet, row by row, each a surface of its own (not a
+# view into the sheet, so it blits as fast as any other)
+def cut_frames(sheet, columns, width, height, rows=1, scale=1, flip=False):
+    frames = []
+    for row in range(rows):
+        for column in range(columns):
+            frame = sheet.subsurface((column * width, row * height, width, height))
+            if scale != 1:
+                frame = pygame.transform.scale(frame, (width * scale, height * scale))
+            else:
+                frame = frame.copy()
+            if flip:
+                frame = pygame.transform.flip(frame, True, False)
+            frames.append(frame)
+    return frames
+
+
+class AssetManager:
+    def __init__(self, budget=32 * 1024 * 1024):
+        self.budget = budget
+        self.entries = OrderedDict()  # key -> surface or frame list, least recently used first
+        self.sizes = {}  # key -> bytes
+        self.resident = 0
+        self.hits = 0
+        self.misses = 0
+        self.decodes = 0
+        self.evictions = 0
+        self.bundle = None
+        self.bundle_misses = 0  # keys the bundle did not have
+
+    def lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        if self.bundle is not None:
+            entry = self.bundle.get(key)
+            if entry is None:
+                self.bundle_misses += 1
+            else:
+                self.store(key, entry, entry_bytes(entry))
+        return entry
+
+    def store(self, key, entry, size):
+        self.entries[key] = entry
+        self.sizes[key] = size
+        self.resident += size
+        while self.resident > self.budget and len(self.entries) > 1:
+            old_key, _ = self.entries.popitem(last=False)
+            self.resident -= self.sizes.pop(old_key)
+            self.evictions += 1
+
+    # The image at path, scaled by a factor or to a (width, height) size and
+    # mirrored left-right when flip is set. convert is "alpha" (per-pixel
+    # alpha), "opaque" or None (as decoded, before a display exists).
+    def image(self, path, scale=1, flip=False, convert="alpha"):
+        key = (path, scale, flip, convert)
+        surface = self.lookup(key)
+        if surface is not None:
+            return surface
+        if scale == 1 and not flip:
+            surface = converted(pygame.image.load(path), convert)
+            self.decodes += 1
+        else:
+            surface = transformed(self.image(path, convert=convert), scale, flip)
+        self.store(key, surface, surface_bytes(surface))
+        return surface
+
+    # The frames of a sprite sheet of columns x rows frames of width x height,
+    # row by row, each scaled by an integer factor and mirrored when flip is
+    # set (see cut_frames).
+    def frames(self, path, columns, width, height, rows=1, scale=1, flip=False, convert="alpha"):
+        key = (path, scale, flip, convert, columns, rows, width, height)
+        frames = self.lookup(key)
+        if frames is not None:
+            return frames
+        frames = cut_frames(self.image(path, convert=convert), columns, width, height, rows, scale, flip)
+        self.store(key, frames, entry_bytes(frames))
+        return frames
+
+    # (key, bytes) for every cached entry, largest first
+    def report(self):
+        return sorted(self.sizes.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,177 @@
+# Packed asset bundle: every surface an AssetManager made, written to one
+# file as ready-to-blit pixels, so the next start maps the file into memory
+# instead of decoding and scaling PNGs.
+#
+# Layout: MAGIC, then the version and the length of a JSON index, the index,
+# and the pixel data of each surface, each starting on a 64-byte boundary
+# (offsets in the index count from there). The index lists each source file
+# with its mtime, size and SHA-1, the display format the pixels were
+# converted for, and per cache key the surfaces' offsets, sizes and pixel
+# formats. A bundle is ignored (and should be written again)
+# when its version or the display format differ, or a source file changed:
+# same mtime and size counts as unchanged, otherwise the hash decides.
+#
+# Surfaces in the display's own 32-bit alpha format are made straight on top
+# of the mapped file (pygame.image.frombuffer), without copying. The mapping
+# is copy-on-write, so drawing on such a surface by mistake never touches
+# the file.
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import pygame
+
+MAGIC = b"PGBUNDLE"
+VERSION = 1
+HEADER = struct.Struct("<II")  # version, index length
+ALIGN = 64
+
+# Masks of 32-bit surfaces whose bytes are B, G, R, A in memory
+BGRA_MASKS = (0xFF0000, 0xFF00, 0xFF, 0xFF000000)
+BGRX_MASKS = (0xFF0000, 0xFF00, 0xFF, 0)
+
+
+def file_hash(path):
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def display_format():
+    surface = pygame.display.get_surface()
+    if surface is None:
+        return None
+    return [surface.get_bitsize(), list(surface.get_masks())]
+
+
+# Pixel bytes of a surface and the frombuffer format to read them back with
+def surface_pixels(surface):
+    if surface.get_bitsize() == 32 and surface.get_masks() in (BGRA_MASKS, BGRX_MASKS):
+        pixel_format = "BGRA" if surface.get_masks() == BGRA_MASKS else "BGRX"
+        return surface.get_buffer().raw, pixel_format, surface.get_pitch()
+    return pygame.image.tobytes(surface, "RGBA"), "RGBA", surface.get_width() * 4
+
+
+def align(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+# Write every entry cached in manager to path
+def save_bundle(path, manager):
+    sources = {}
+    entries = {}
+    blobs = []
+    offset = 0
+    for key, entry in manager.entries.items():
+        source = key[0]
+        if source not in sources:
+            stat = os.stat(source)
+            sources[source] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "sha1": file_hash(source)}
+        surfaces = entry if isinstance(entry, list) else [entry]
+        records = []
+        for surface in surfaces:
+            pixels, pixel_format, pitch = surface_pixels(surface)
+            records.append([offset, surface.get_width(), surface.get_height(), pitch, pixel_format])
+            blobs.append((offset, pixels))
+            offset = align(offset + len(pixels))
+        entries[json.dumps(key)] = {"frames": isinstance(entry, list), "convert": key[3], "surfaces": records}
+
+    index = json.dumps({"display": display_format(), "sources": sources, "entries": entries}).encode()
+    data_start = align(len(MAGIC) + HEADER.size + len(index))
+
+    # A temporary file of our own, so processes saving at the same time do
+    # not write into each other's
+    directory, name = os.path.split(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=name + ".", suffix=".tmp", delete=False) as file:
+        try:
+            file.write(MAGIC + HEADER.pack(VERSION, len(index)) + index)
+            for offset, pixels in blobs:
+                file.seek(data_start + offset)
+                file.write(pixels)
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+    # Readers that still map the old file keep seeing it
+    os.replace(file.name, path)
+
+
+class AssetBundle:
+    def __init__(self, mapping, index, data_start):
+        self.mapping = mapping
+        self.view = memoryview(mapping)[data_start:]
+        self.entries = index["entries"]
+
+    def surface(self, record, convert):
+        offset, width, height, pitch, pixel_format = record
+        pixels = self.view[offset:offset + pitch * height]
+        if pixel_format == "BGRA":
+            return pygame.image.frombuffer(pixels, (width, height), "BGRA", pitch)
+        # The display's opaque format has no frombuffer name; read it as
+        # BGRA and convert, which copies but decodes nothing
+        surface = pygame.image.frombuffer(pixels, (width, height), "BGRA" if pixel_format == "BGRX" else pixel_format, pitch)
+        if convert == "alpha":
+            return surface.convert_alpha()
+        if convert == "opaque" or pixel_format == "BGRX":
+            return surface.convert()
+        return surface
+
+    # The surface or frame list cached under key, or None
+    def get(self, key):
+        entry = self.entries.get(json.dumps(key))
+        if entry is None:
+            return None
+        surfaces = [self.surface(record, entry["convert"]) for record in entry["surfaces"]]
+        return surfaces if entry["frames"] else surfaces[0]
+
+
+def source_unchanged(path, recorded):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_mtime_ns == recorded["mtime"] and stat.st_size == recorded["size"]:
+        return True
+    return stat.st_size == recorded["size"] and file_hash(path) == recorded["sha1"]
+
+
+# The bundle at path, or None when there is none, it is out of date or it
+# cannot be read (cut short or corrupt), so the caller writes it again.
+# Needs the display mode to be set.
+def open_bundle(path):
+    try:
+        with open(path, "rb") as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError):
+        return None
+    try:
+        return read_bundle(mapping)
+    except (struct.error, ValueError, KeyError, TypeError):
+        # json.JSONDecodeError and UnicodeDecodeError are ValueErrors
+        return None
+
+
+def read_bundle(mapping):
+    start = len(MAGIC) + HEADER.size
+    if mapping[:len(MAGIC)] != MAGIC:
+        return None
+    version, index_length = HEADER.unpack(mapping[len(MAGIC):start])
+    if version != VERSION:
+        return None
+    if start + index_length > len(mapping):
+        return None
+    index = json.loads(mapping[start:start + index_length])
+    if index["display"] != display_format():
+        return None
+    if not all(source_unchanged(source, recorded) for source, recorded in index["sources"].items()):
+        return None
+    data_start = align(start + index_length)
+    # Every surface's pixels must be in the file
+    size = len(mapping) - data_start
+    for entry in index["entries"].values():
+        for offset, width, height, pitch, pixel_format in entry["surfaces"]:
+            if offset + pitch * height > size:
+                return None
+    return AssetBundle(mapping, index, data_start)
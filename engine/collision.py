@@ -0,0 +1,71 @@
+# Collision against things that never move during a level (trees, walls).
+# Broad phase: every obstacle is listed in each cell of a coarse grid its
+# rect covers, so a lookup only sees obstacles near the moving rect however
+# many there are. Narrow phase: a pixel mask per obstacle image, made once
+# and shared by every obstacle using that image, so the transparent corners
+# of a sprite's bounding box are not solid.
+import weakref
+
+import pygame
+
+# Masks are keyed by the Surface itself and dropped with it
+_image_masks = weakref.WeakKeyDictionary()
+_rect_masks = {}
+
+
+def mask_for(image):
+    mask = _image_masks.get(image)
+    if mask is None:
+        mask = _image_masks[image] = pygame.mask.from_surface(image)
+    return mask
+
+
+# Fully solid mask of the given size, for testing a plain rect against masks
+def rect_mask(size):
+    mask = _rect_masks.get(size)
+    if mask is None:
+        mask = _rect_masks[size] = pygame.Mask(size, fill=True)
+    return mask
+
+
+class StaticCollisionIndex:
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> [(item, rect, mask)]
+
+    def clear(self):
+        self.cells.clear()
+
+    # item is returned by colliding(); a mask of None makes the whole rect solid
+    def add(self, item, rect, mask=None):
+        entry = (item, pygame.Rect(rect), mask)
+        size = self.cell_size
+        for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                self.cells.setdefault((cx, cy), []).append(entry)
+
+    # Items whose solid pixels overlap rect
+    def colliding(self, rect):
+        size = self.cell_size
+        cells = self.cells
+        found = []
+        solid = None
+        for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                bucket = cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for item, other, mask in bucket:
+                    if not rect.colliderect(other):
+                        continue
+                    # An obstacle listed in several of these cells is only
+                    # handled in the cell holding the overlap's top-left corner
+                    if max(rect.left, other.left) // size != cx or max(rect.top, other.top) // size != cy:
+                        continue
+                    if mask is not None:
+                        if solid is None:
+                            solid = rect_mask(rect.size)
+                        if mask.overlap(solid, (rect.x - other.x, rect.y - other.y)) is None:
+                            continue
+                    found.append(item)
+        return found
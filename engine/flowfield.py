@@ -0,0 +1,182 @@
+# Flow-field navigation toward one target, shared by every chaser.
+# The world is split into square cells; cells a chaser's centre cannot enter
+# without touching an obstacle are blocked once per level. Whenever the
+# target moves to another cell, one breadth-first search from the target's
+# cell gives every reachable cell the step (-1, 0 or 1 per axis) that leads
+# one cell closer. Steps may be diagonal, which costs the same as a straight
+# step just like a chaser moving on both axes at once, but never cut a
+# blocked corner. Blocked cells get the step that leads out to the nearest
+# free cell instead, so a chaser pushed into an obstacle walks back out
+# rather than toward the target through it. A chaser then only looks up its
+# cell's step, so the cost per frame does not grow with the number of
+# chasers.
+from array import array
+from collections import deque
+
+# Straight neighbours first so they win ties
+NEIGHBOURS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+class FlowField:
+    # Steps are worked out up to max_distance pixels (in cell steps) from
+    # the target; chasers further away than that move straight at it
+    def __init__(self, width, height, cell_size=32, max_distance=1000):
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.max_distance = max_distance
+        self.columns = -(-width // cell_size)
+        self.rows = -(-height // cell_size)
+        self.max_steps = -(-max_distance // cell_size)
+        cells = self.columns * self.rows
+        self.blocked = bytearray(cells)
+        # has_step[cell] is 1 when step_x/step_y hold a way toward the target
+        self.has_step = bytearray(cells)
+        self.step_x = array("b", bytes(cells))
+        self.step_y = array("b", bytes(cells))
+        # Per cell, the (neighbour, step x, step y) moves that are allowed,
+        # worked out the first time a search reaches the cell
+        self.links = [None] * cells
+        # (cell, step x, step y) out of every blocked cell, worked out on the
+        # first rebuild after blocking changes
+        self.exits = None
+        self.target_cell = None
+        self.version = 0  # bumped on every rebuild
+
+    # Unblock every cell and forget the field, keeping the arrays
+    def clear(self):
+        self.blocked[:] = bytes(len(self.blocked))
+        self.has_step[:] = bytes(len(self.has_step))
+        self.links = [None] * len(self.blocked)
+        self.exits = None
+        self.target_cell = None
+
+    # Block the cells where a chaser of size (width, height), centred in the
+    # cell, would overlap rect
+    def block_rect(self, rect, width=0, height=0):
+        size = self.cell_size
+        left = max(0, (rect.left - width // 2) // size)
+        right = min(self.columns - 1, (rect.right + width // 2) // size)
+        top = max(0, (rect.top - height // 2) // size)
+        bottom = min(self.rows - 1, (rect.bottom + height // 2) // size)
+        for row in range(top, bottom + 1):
+            start = row * self.columns
+            self.blocked[start + left:start + right + 1] = b"\x01" * (right - left + 1)
+        self.links = [None] * len(self.blocked)
+        self.exits = None
+        self.target_cell = None
+
+    def cell_at(self, x, y):
+        column, row = int(x) // self.cell_size, int(y) // self.cell_size
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return row * self.columns + column
+        return None
+
+    # Point the field at (x, y). Rebuilds only when that is a new cell;
+    # returns True if it did.
+    def update(self, x, y):
+        cell = self.cell_at(x, y)
+        if cell is None or cell == self.target_cell:
+            return False
+        self.rebuild(cell)
+        return True
+
+    # Moves out of cell into free neighbours, with the step back into cell
+    def cell_links(self, cell):
+        columns, rows, blocked = self.columns, self.rows, self.blocked
+        column, row = cell % columns, cell // columns
+        links = []
+        for ox, oy in NEIGHBOURS:
+            if not (0 <= column + ox < columns and 0 <= row + oy < rows):
+                continue
+            neighbour = cell + oy * columns + ox
+            if blocked[neighbour]:
+                continue
+            if ox and oy and (blocked[cell + ox] or blocked[cell + oy * columns]):
+                continue
+            links.append((neighbour, -ox, -oy))
+        self.links[cell] = links
+        return links
+
+    # Steps out of the blocked cells: a breadth-first search from every free
+    # cell into the blocked ones, each blocked cell stepping to a neighbour
+    # one cell closer to free ground, straight when it can
+    def find_exits(self):
+        columns, rows, blocked = self.columns, self.rows, self.blocked
+        exits = {}  # blocked cell -> (step x, step y)
+        distance = [0 if not is_blocked else -1 for is_blocked in blocked]
+        queue = deque(cell for cell in range(len(blocked)) if not blocked[cell])
+        while queue:
+            cell = queue.popleft()
+            column, row = cell % columns, cell // columns
+            next_distance = distance[cell] + 1
+            for ox, oy in NEIGHBOURS:
+                if not (0 <= column + ox < columns and 0 <= row + oy < rows):
+                    continue
+                neighbour = cell + oy * columns + ox
+                seen = distance[neighbour]
+                if seen == -1:
+                    distance[neighbour] = next_distance
+                    exits[neighbour] = (-ox, -oy)
+                    queue.append(neighbour)
+                elif seen == next_distance and not (ox and oy):
+                    exits[neighbour] = (-ox, -oy)
+        self.exits = [(cell, sx, sy) for cell, (sx, sy) in exits.items()]
+        return self.exits
+
+    def rebuild(self, target):
+        columns = self.columns
+        all_links = self.links
+        has_step, step_x, step_y = self.has_step, self.step_x, self.step_y
+        has_step[:] = bytes(len(has_step))
+        distance = [-1] * len(has_step)
+        target_column, target_row = target % columns, target // columns
+        max_steps = self.max_steps
+
+        distance[target] = 0
+        queue = deque([target])
+        while queue:
+            cell = queue.popleft()
+            next_distance = distance[cell] + 1
+            if next_distance > max_steps:
+                continue
+            links = all_links[cell]
+            if links is None:
+                links = self.cell_links(cell)
+            for neighbour, sx, sy in links:
+                seen = distance[neighbour]
+                if seen == -1:
+                    distance[neighbour] = next_distance
+                    step_x[neighbour] = sx
+                    step_y[neighbour] = sy
+                    has_step[neighbour] = 1
+                    queue.append(neighbour)
+                elif seen == next_distance and sx == sign(target_column - neighbour % columns) and sy == sign(target_row - neighbour // columns):
+                    # Equally short and heads straight at the target, as a
+                    # chaser in the open would
+                    step_x[neighbour] = sx
+                    step_y[neighbour] = sy
+
+        exits = self.exits
+        if exits is None:
+            exits = self.find_exits()
+        for cell, sx, sy in exits:
+            step_x[cell] = sx
+            step_y[cell] = sy
+            has_step[cell] = 1
+
+        self.target_cell = target
+        self.version += 1
+
+    # Step toward the target from (x, y) (out of the obstacle in a blocked
+    # cell), or None where the field has none (the target's own cell,
+    # unreachable cells, too far away)
+    def step(self, x, y):
+        cell = self.cell_at(x, y)
+        if cell is None or not self.has_step[cell]:
+            return None
+        return self.step_x[cell], self.step_y[cell]
@@ -0,0 +1,70 @@
+# Attack hitboxes that are live on some frames of an attack animation.
+# The owner aims the hitbox each tick it is live; collect() then tests only
+# the candidates a spatial query returned, hits each target at most once per
+# swing and appends (target, damage) events to a list, so damage, score and
+# effects are applied for a whole tick at once.
+import math
+
+import pygame
+
+
+# Axis-aligned box hitbox
+class Hitbox:
+    def __init__(self, damage, active_frames):
+        self.damage = damage
+        self.active_frames = frozenset(active_frames)
+        self.rect = None  # area covered, aimed by the owner
+        self.hit = set()  # targets already hit in this swing
+
+    # Forget the previous swing's targets
+    def start(self):
+        self.hit.clear()
+
+    def active(self, frame):
+        return frame in self.active_frames
+
+    def aim(self, rect):
+        self.rect = pygame.Rect(rect)
+
+    def contains(self, rect):
+        return self.rect.colliderect(rect)
+
+    # Append an event for every candidate the hitbox reaches that was not hit
+    # yet in this swing. Candidates need a .rect.
+    def collect(self, candidates, events):
+        hit = self.hit
+        for target in candidates:
+            if target not in hit and self.contains(target.rect):
+                hit.add(target)
+                events.append((target, self.damage))
+
+
+# Cone hitbox: targets whose centre is within reach of origin and within
+# half_angle degrees (at most 90) of the facing direction. rect is the
+# cone's bounding box, for the spatial query.
+class ConeHitbox(Hitbox):
+    def __init__(self, damage, active_frames, half_angle=45):
+        super().__init__(damage, active_frames)
+        self.cos_half_angle = math.cos(math.radians(half_angle))
+        self.origin = (0, 0)
+        self.facing = (1, 0)
+        self.reach = 0
+
+    # facing is a direction vector, (1, 0) for right
+    def aim(self, origin, facing, reach):
+        length = math.hypot(*facing)
+        self.origin = origin
+        self.facing = (facing[0] / length, facing[1] / length)
+        self.reach = reach
+        self.rect = pygame.Rect(origin[0] - reach, origin[1] - reach, reach * 2, reach * 2)
+
+    def contains(self, rect):
+        dx = rect.centerx - self.origin[0]
+        dy = rect.centery - self.origin[1]
+        distance_sq = dx * dx + dy * dy
+        if distance_sq > self.reach * self.reach:
+            return False
+        if distance_sq == 0:
+            return True
+        along = dx * self.facing[0] + dy * self.facing[1]
+        return along >= 0 and along * along >= self.cos_half_angle ** 2 * distance_sq
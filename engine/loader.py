@@ -0,0 +1,148 @@
+# Background asset loading.
+# Images are decoded, converted, scaled and cut into frames on a pool of
+# worker threads (pygame lets go of the GIL while it decodes and scales), so
+# the main thread stays free to draw, e.g. a loading screen. The workers
+# convert to the pixel formats of small surfaces the main thread converted
+# for the display, which gives the same pixels and flags as convert() and
+# convert_alpha(). Storing into the AssetManager happens on the main thread,
+# in poll(), so the manager is only ever touched from there. Requests marked
+# critical are what the game needs before it can start; the rest (later
+# levels, sounds) keep streaming in while it runs.
+#
+#     loader = AssetLoader(assets)
+#     loader.frames("assets/knight/walking.png", 8, 42, 42, critical=True)
+#     loader.call(pygame.mixer.Sound, "assets/sound/attack.wav", done=set_sound)
+#     loader.start()
+#     while not loader.critical_ready():
+#         loader.poll()
+#         ...draw loader.progress()
+#     walking = assets.frames("assets/knight/walking.png", 8, 42, 42)  # cached now
+#
+# Whatever the manager already has (cached or in its bundle) is not loaded
+# again, so with an up-to-date bundle there is nothing to wait for.
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pygame
+
+from engine.assets import cut_frames, entry_bytes, transformed
+
+
+# Worker side: decode the file once and make every variant asked for, the
+# way AssetManager.image and .frames would. Returns (key, entry) pairs,
+# the plain converted image included.
+def decode(path, keys, formats):
+    source = pygame.image.load(path)
+    images = {}  # convert -> the image converted that way
+    entries = []
+    for key in keys:
+        convert = key[3]
+        if convert not in images:
+            images[convert] = source.convert(formats[convert]) if convert else source
+            entries.append(((path, 1, False, convert), images[convert]))
+        if len(key) == 4:
+            _, scale, flip, _ = key
+            if scale != 1 or flip:
+                entries.append((key, transformed(images[convert], scale, flip)))
+        else:
+            _, scale, flip, _, columns, rows, width, height = key
+            entries.append((key, cut_frames(images[convert], columns, width, height, rows, scale, flip)))
+    return entries
+
+
+class AssetLoader:
+    def __init__(self, manager, workers=4):
+        self.manager = manager
+        self.workers = workers
+        self.executor = None
+        self.started = False  # requests made after start() go out at once
+        self.formats = None  # convert -> surface in that pixel format
+        self.images = {}  # path -> cache keys of the variants asked for
+        self.critical_paths = set()
+        self.calls = []  # (function, args, done, critical) waiting for start()
+        self.pending = []  # (future, finish, critical)
+        self.done = 0
+        self.total = 0
+
+    def request(self, key, critical):
+        if self.manager.lookup(key) is not None:
+            return
+        keys = self.images.setdefault(key[0], [])
+        if key not in keys:
+            keys.append(key)
+        if critical:
+            self.critical_paths.add(key[0])
+
+    # Same arguments as AssetManager.image / AssetManager.frames
+    def image(self, path, scale=1, flip=False, convert="alpha", critical=False):
+        self.request((path, scale, flip, convert), critical)
+
+    def frames(self, path, columns, width, height, rows=1, scale=1, flip=False, convert="alpha", critical=False):
+        self.request((path, scale, flip, convert, columns, rows, width, height), critical)
+
+    # Run function(*args) on a worker; done(result) is then called on the
+    # main thread by poll()
+    def call(self, function, *args, done=None, critical=False):
+        self.calls.append((function, args, done, critical))
+        if self.started:
+            self.start()
+
+    # Hand everything asked for so far to the workers, starting them if
+    # they are not running. Images need the display mode to be set.
+    def start(self):
+        self.started = True
+        if not self.images and not self.calls:
+            return
+        if self.images and self.formats is None:
+            self.formats = {
+                "alpha": pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha(),
+                "opaque": pygame.Surface((1, 1)).convert(),
+            }
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="assets")
+        for path, keys in self.images.items():
+            future = self.executor.submit(decode, path, keys, self.formats)
+            self.pending.append((future, self.store, path in self.critical_paths))
+        for function, args, done, critical in self.calls:
+            self.pending.append((self.executor.submit(function, *args), done, critical))
+        self.total += len(self.images) + len(self.calls)
+        self.images = {}
+        self.critical_paths = set()
+        self.calls = []
+
+    def store(self, entries):
+        manager = self.manager
+        manager.decodes += 1
+        for key, entry in entries:
+            if key not in manager.entries:
+                manager.store(key, entry, entry_bytes(entry))
+
+    # Finish whatever the workers are done with. Returns how many jobs are
+    # still running.
+    def poll(self):
+        still_pending = []
+        for future, finish, critical in self.pending:
+            if future.done():
+                result = future.result()
+                if finish is not None:
+                    finish(result)
+                self.done += 1
+            else:
+                still_pending.append((future, finish, critical))
+        self.pending = still_pending
+        if not still_pending and not self.calls and not self.images and self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        return len(still_pending)
+
+    # Block until the critical jobs (everything with everything set) are
+    # finished, or timeout seconds have passed
+    def wait(self, everything=False, timeout=None):
+        wait([future for future, _, critical in self.pending if critical or everything], timeout)
+        self.poll()
+
+    def critical_ready(self):
+        return not any(critical for _, _, critical in self.pending)
+
+    # (jobs finished, jobs started)
+    def progress(self):
+        return self.done, self.total
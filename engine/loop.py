@@ -0,0 +1,132 @@
+# Fixed-timestep game loop.
+# Game logic and physics advance in ticks of a fixed length, however long a
+# frame takes, so speeds and animation timers counted in ticks mean the same
+# thing at any frame rate. Drawing happens once per frame, between the last
+# two ticks (alpha says how far), and is skipped now and then when frames fall
+# behind, so the simulation stays on time on slow machines.
+#
+#     loop = FixedTimestep(60)
+#     while running:
+#         for _ in range(loop.advance(clock.tick(60) / 1000)):
+#             bodies.save()
+#             ...                   # one tick of game logic
+#             space.step(loop.dt)
+#         if loop.should_render():
+#             with bodies.drawn_at(loop.alpha):
+#                 ...               # draw
+from array import array
+from contextlib import contextmanager
+
+
+class FixedTimestep:
+    def __init__(self, tick_rate=60, max_ticks_per_frame=5, max_skipped_renders=2):
+        self.tick_rate = tick_rate
+        self.dt = 1 / tick_rate
+        # After a long stall (window drag, breakpoint) only this many ticks
+        # are caught up; the rest of the backlog is dropped
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.max_skipped_renders = max_skipped_renders
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.ticks = 0
+        self.behind = False
+        self.skipped_renders = 0
+
+    # Add a frame's elapsed seconds and return how many ticks are due
+    def advance(self, elapsed):
+        self.accumulator += elapsed
+        due = int(self.accumulator * self.tick_rate)
+        if due > self.max_ticks_per_frame:
+            self.accumulator -= (due - self.max_ticks_per_frame) * self.dt
+            due = self.max_ticks_per_frame
+        self.accumulator = max(0.0, self.accumulator - due * self.dt)
+        self.alpha = min(1.0, self.accumulator * self.tick_rate)
+        self.ticks += due
+        # Two ticks in a frame is ordinary at 30 FPS; more than that means
+        # drawing is eating into the simulation's time
+        self.behind = due > 2
+        return due
+
+    # False when this frame's drawing should be dropped to let the
+    # simulation catch up; never more than max_skipped_renders in a row
+    def should_render(self):
+        if self.behind and self.skipped_renders < self.max_skipped_renders:
+            self.skipped_renders += 1
+            return False
+        self.skipped_renders = 0
+        return True
+
+    # Forget the backlog, e.g. after a blocking menu or level load
+    def reset(self):
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.behind = False
+
+
+def lerp(previous, current, alpha):
+    return previous + (current - previous) * alpha
+
+
+# Interpolated drawing for pymunk bodies. save() keeps every body's position
+# before a tick; drawn_at(alpha) moves the bodies between that position and
+# the current one for the duration of the draw and puts them back after.
+class InterpolatedBodies:
+    def __init__(self, bodies=()):
+        self.bodies = list(bodies)
+        self.previous = [body.position for body in self.bodies]
+
+    def save(self):
+        self.previous = [body.position for body in self.bodies]
+
+    @contextmanager
+    def drawn_at(self, alpha):
+        current = [body.position for body in self.bodies]
+        for body, previous, position in zip(self.bodies, self.previous, current):
+            body.position = lerp(previous, position, alpha)
+        try:
+            yield
+        finally:
+            for body, position in zip(self.bodies, current):
+                body.position = position
+
+
+# Interpolated drawing for pygame sprites: remembers each sprite's rect
+# position before a tick and gives back the in-between position to draw at.
+# Sprites without a position from the last save() (just spawned) are drawn
+# where they are. Each sprite keeps a slot in flat coordinate arrays that
+# save() overwrites, so once every sprite has a slot (pooled sprites keep
+# theirs) a tick allocates nothing; clear() hands the slots out afresh.
+class InterpolatedSprites:
+    def __init__(self):
+        self.slots = {}  # sprite -> index into x, y and saved
+        self.x = array("l")
+        self.y = array("l")
+        self.saved = array("q")  # the save() each slot was last written by
+        self.saves = 0
+
+    def save(self, sprites):
+        self.saves += 1
+        saves, slots, xs, ys, saved = self.saves, self.slots, self.x, self.y, self.saved
+        for sprite in sprites:
+            slot = slots.get(sprite)
+            if slot is None:
+                slot = slots[sprite] = len(slots)
+                if slot == len(xs):
+                    xs.append(0)
+                    ys.append(0)
+                    saved.append(0)
+            rect = sprite.rect
+            xs[slot] = rect.x
+            ys[slot] = rect.y
+            saved[slot] = saves
+
+    def clear(self):
+        self.slots.clear()
+        self.saves += 1
+
+    def position(self, sprite, alpha):
+        rect = sprite.rect
+        slot = self.slots.get(sprite)
+        if slot is None or self.saved[slot] != self.saves:
+            return rect.topleft
+        return round(lerp(self.x[slot], rect.x, alpha)), round(lerp(self.y[slot], rect.y, alpha))
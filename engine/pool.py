@@ -0,0 +1,23 @@
+# Object pool for entities that come and go by the hundred (enemies, effects).
+# Released objects are kept and handed out again by acquire(), which calls
+# their reset() with the same arguments the class constructor takes, so a
+# level change only resets state instead of building every object anew.
+
+
+class Pool:
+    def __init__(self, factory):
+        self.factory = factory
+        self.free = []
+
+    def acquire(self, *args):
+        if self.free:
+            item = self.free.pop()
+            item.reset(*args)
+            return item
+        return self.factory(*args)
+
+    def release(self, item):
+        self.free.append(item)
+
+    def release_all(self, items):
+        self.free.extend(items)
@@ -0,0 +1,205 @@
+# Per-phase frame profiler.
+#
+#     profiler = FrameProfiler(enabled=os.environ.get("PROFILE") == "1")
+#     while running:
+#         with profiler.scope("input"):
+#             ...
+#         profiler.end_frame()
+#
+# Each named scope's duration goes into a fixed-size ring buffer, from which
+# p50/p95/p99 are read for the overlay and the exports. When the profiler is
+# disabled, scope() hands back one shared no-op object, so instrumentation can
+# stay in the game loops for good. F3 toggles profiling and the overlay, F4
+# writes the exports.
+import csv
+import json
+import time
+
+import pygame
+
+from engine import startup
+
+perf_counter = time.perf_counter
+
+
+class RingBuffer:
+    def __init__(self, capacity):
+        self.values = [0.0] * capacity
+        self.index = 0
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        if self.count < len(self.values):
+            self.count += 1
+
+    # Oldest first
+    def items(self):
+        if self.count < len(self.values):
+            return self.values[:self.count]
+        return self.values[self.index:] + self.values[:self.index]
+
+
+class _Scope:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start, perf_counter())
+        return False
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SCOPE = _NullScope()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    def __init__(self, enabled=False, capacity=600, trace_capacity=20000):
+        self.enabled = enabled
+        self.show_overlay = enabled
+        self.capacity = capacity
+        self.phases = {}
+        self.frame_times = RingBuffer(capacity)
+        # (name, start, end, frame) spans for the Chrome trace export
+        self.spans = [None] * trace_capacity
+        self.span_index = 0
+        self.frame = 0
+        self.frame_start = None
+        self.overlay_surface = None
+        self.overlay_frame = -1
+        self.font = None
+
+    def scope(self, name):
+        if not self.enabled:
+            return NULL_SCOPE
+        return _Scope(self, name)
+
+    def record(self, name, start, end):
+        buffer = self.phases.get(name)
+        if buffer is None:
+            buffer = self.phases[name] = RingBuffer(self.capacity)
+        buffer.append(end - start)
+        self.spans[self.span_index] = (name, start, end, self.frame)
+        self.span_index = (self.span_index + 1) % len(self.spans)
+
+    # Call once at the end of every frame; records the whole frame's time
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = perf_counter()
+        if self.frame_start is not None:
+            self.frame_times.append(now - self.frame_start)
+        self.frame_start = now
+        self.frame += 1
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.show_overlay = self.enabled
+        self.frame_start = None
+
+    # F3: toggle profiling and overlay, F4: export. Returns True if handled.
+    def handle_event(self, event, export_prefix="profile"):
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == pygame.K_F3:
+            self.toggle()
+            return True
+        if event.key == pygame.K_F4:
+            self.export_csv(export_prefix + ".csv")
+            self.export_chrome_trace(export_prefix + "_trace.json")
+            return True
+        return False
+
+    # {"phase": {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms"}} plus "frame"
+    def summary(self):
+        result = {}
+        buffers = dict(self.phases)
+        buffers["frame"] = self.frame_times
+        for name, buffer in buffers.items():
+            values = sorted(buffer.items())
+            if not values:
+                continue
+            result[name] = {
+                "count": len(values),
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+            }
+        return result
+
+    def export_json(self, path):
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+
+    # One row per recorded sample, oldest first
+    def export_csv(self, path):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["phase", "sample", "ms"])
+            buffers = dict(self.phases)
+            buffers["frame"] = self.frame_times
+            for name, buffer in buffers.items():
+                for sample, seconds in enumerate(buffer.items()):
+                    writer.writerow([name, sample, round(seconds * 1000, 4)])
+
+    # Complete ("X") events, viewable in chrome://tracing or Perfetto
+    def export_chrome_trace(self, path):
+        spans = [span for span in self.spans[self.span_index:] + self.spans[:self.span_index] if span is not None]
+        events = [
+            {"name": name, "ph": "X", "pid": 0, "tid": 0, "ts": start * 1e6, "dur": (end - start) * 1e6, "args": {"frame": frame}}
+            for name, start, end, frame in spans
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    # Table of p50/p95/p99 per phase for the top-right corner, as a
+    # (surface, position) pair or None when hidden. The text is rebuilt twice
+    # a second so the overlay does not distort what it measures.
+    def overlay(self, screen_width):
+        if not self.show_overlay:
+            return None
+        if self.overlay_surface is None or self.frame - self.overlay_frame >= 30:
+            if self.font is None:
+                startup.fonts()
+                self.font = pygame.font.SysFont("monospace", 14)
+            lines = ["phase        p50     p95     p99 (ms)"]
+            for name, stats in self.summary().items():
+                lines.append(f"{name:<10} {stats['p50_ms']:7.2f} {stats['p95_ms']:7.2f} {stats['p99_ms']:7.2f}")
+            line_height = self.font.get_linesize()
+            width = max(self.font.size(line)[0] for line in lines) + 10
+            self.overlay_surface = pygame.Surface((width, line_height * len(lines) + 10), pygame.SRCALPHA)
+            self.overlay_surface.fill((0, 0, 0, 170))
+            for row, line in enumerate(lines):
+                self.overlay_surface.blit(self.font.render(line, True, (255, 255, 255)), (5, 5 + row * line_height))
+            self.overlay_frame = self.frame
+        return self.overlay_surface, (screen_width - self.overlay_surface.get_width() - 10, 10)
+
+    def draw_overlay(self, surface):
+        item = self.overlay(surface.get_width())
+        if item is not None:
+            surface.blit(*item)
@@ -0,0 +1,110 @@
+# Entity registry with sparse-set component storage.
+# An entity is an int id. Each component type has a store of its own: the
+# values packed in a dense list, the entity owning each value, and a sparse
+# map from entity to slot. Adding appends; removing moves the last value
+# into the freed slot. Both are O(1) whatever the count, and the values
+# always sit packed at the front of the list, so systems loop over
+# store.values directly instead of building a list each frame. Removing
+# reorders the values, so nothing may rely on their order. Ids of destroyed
+# entities are handed out again.
+#
+#     registry = Registry()
+#     slime = registry.create(enemy=Enemy(...))
+#     for enemy in registry.store("enemy").values:
+#         enemy.update(player)
+#     registry.destroy(slime)
+
+
+class ComponentStore:
+    def __init__(self):
+        self.values = []  # packed, in no particular order
+        self.entities = []  # entity owning each value
+        self.slots = {}  # entity -> index into values
+
+    def add(self, entity, value):
+        slot = self.slots.get(entity)
+        if slot is not None:
+            self.values[slot] = value
+            return
+        self.slots[entity] = len(self.values)
+        self.values.append(value)
+        self.entities.append(entity)
+
+    # Returns the removed value
+    def remove(self, entity):
+        slot = self.slots.pop(entity)
+        value = self.values[slot]
+        last_value = self.values.pop()
+        last_entity = self.entities.pop()
+        if slot < len(self.values):
+            self.values[slot] = last_value
+            self.entities[slot] = last_entity
+            self.slots[last_entity] = slot
+        return value
+
+    def get(self, entity, default=None):
+        slot = self.slots.get(entity)
+        return default if slot is None else self.values[slot]
+
+    # Empty the store in place; lists handed out stay valid
+    def clear(self):
+        self.values.clear()
+        self.entities.clear()
+        self.slots.clear()
+
+    def __contains__(self, entity):
+        return entity in self.slots
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+
+class Registry:
+    def __init__(self):
+        self.stores = {}  # component name -> ComponentStore
+        self.free = []  # ids of destroyed entities
+        self.next_id = 0
+
+    # The store of a component, made on first use
+    def store(self, component):
+        store = self.stores.get(component)
+        if store is None:
+            store = self.stores[component] = ComponentStore()
+        return store
+
+    # A new entity with the given components, e.g. create(enemy=slime)
+    def create(self, **components):
+        if self.free:
+            entity = self.free.pop()
+        else:
+            entity = self.next_id
+            self.next_id += 1
+        for component, value in components.items():
+            self.store(component).add(entity, value)
+        return entity
+
+    def destroy(self, entity):
+        for store in self.stores.values():
+            if entity in store.slots:
+                store.remove(entity)
+        self.free.append(entity)
+
+    def add(self, entity, component, value):
+        self.store(component).add(entity, value)
+
+    def remove(self, entity, component):
+        return self.stores[component].remove(entity)
+
+    def get(self, entity, component, default=None):
+        store = self.stores.get(component)
+        return default if store is None else store.get(entity, default)
+
+    # Destroy every entity at once
+    def clear(self):
+        for store in self.stores.values():
+            store.clear()
+        self.free.clear()
+        self.next_id = 0
@@ -0,0 +1,105 @@
+# Frame renderers.
+# Both take the same input each frame: a static background surface, the
+# moving sprites as (surface, rect) pairs and the overlays drawn on top of
+# them (castle, HUD text), also as (surface, rect) pairs. draw() composes the
+# frame, present() shows it.
+import pygame
+
+
+# Redraws the whole screen every frame
+class FullRenderer:
+    def __init__(self, screen, background):
+        self.screen = screen
+        self.background = background
+
+    def set_background(self, background):
+        self.background = background
+
+    def invalidate(self):
+        pass
+
+    def draw(self, sprites, overlays=()):
+        self.screen.blit(self.background, (0, 0))
+        self.screen.blits(sprites, doreturn=False)
+        self.screen.blits(overlays, doreturn=False)
+
+    def present(self):
+        pygame.display.flip()
+
+
+# Redraws and presents only the rects that changed since the last frame.
+# Old and new sprite rects are erased from the background, sprites are drawn
+# again, and any overlay touching an erased area is redrawn as a whole (it is
+# erased first too, so translucent text never blends over itself). Only those
+# rects are passed to pygame.display.update.
+class DirtyRenderer:
+    # Above this many dirty rects one full update is cheaper than many small ones
+    MAX_RECTS = 300
+
+    def __init__(self, screen, background):
+        self.screen = screen
+        self.background = background
+        self.full_redraw = True
+        self.previous_rects = []
+        self.previous_overlays = {}
+        self.update_rects = None  # None means the whole screen
+
+    def set_background(self, background):
+        self.background = background
+        self.full_redraw = True
+
+    # Force a full repaint, e.g. after something else drew over the screen
+    def invalidate(self):
+        self.full_redraw = True
+
+    def draw(self, sprites, overlays=()):
+        screen = self.screen
+        sprite_rects = [surface.get_rect(topleft=getattr(pos, "topleft", pos)) for surface, pos in sprites]
+        overlays = [(surface, surface.get_rect(topleft=getattr(pos, "topleft", pos))) for surface, pos in overlays]
+        current_overlays = {(id(surface), tuple(rect)): rect for surface, rect in overlays}
+
+        if self.full_redraw:
+            screen.blit(self.background, (0, 0))
+            screen.blits(sprites, doreturn=False)
+            screen.blits(overlays, doreturn=False)
+            self.update_rects = None
+            self.previous_rects = sprite_rects
+            self.previous_overlays = current_overlays
+            self.full_redraw = False
+            return
+
+        # Where sprites were and are, and where overlays appeared or went away
+        dirty = self.previous_rects + sprite_rects
+        for key, rect in current_overlays.items():
+            if key not in self.previous_overlays:
+                dirty.append(rect)
+        for key, rect in self.previous_overlays.items():
+            if key not in current_overlays:
+                dirty.append(rect)
+
+        # Overlays touching a dirty area are redrawn whole, which dirties
+        # their full rect and may pull in further overlays
+        redraw = [False] * len(overlays)
+        changed = True
+        while changed:
+            changed = False
+            for index, (surface, rect) in enumerate(overlays):
+                if not redraw[index] and rect.collidelist(dirty) != -1:
+                    redraw[index] = True
+                    dirty.append(rect)
+                    changed = True
+
+        for rect in dirty:
+            screen.blit(self.background, rect, rect)
+        screen.blits(sprites, doreturn=False)
+        screen.blits([overlay for overlay, again in zip(overlays, redraw) if again], doreturn=False)
+
+        self.update_rects = None if len(dirty) > self.MAX_RECTS else dirty
+        self.previous_rects = sprite_rects
+        self.previous_overlays = current_overlays
+
+    def present(self):
+        if self.update_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.update_rects)
@@ -0,0 +1,93 @@
+# Time-sliced AI updates with level of detail.
+# Each tick, lod(agent, *args) says how many ticks may pass between an
+# agent's full updates: 1 for agents that must think every tick (close to
+# the player), more for far or idle ones. Agents are staggered over their
+# interval so the far ones do not all come due on the same tick. On the
+# ticks in between, and when the budget has run out, an agent is moved on by
+# agent.coast(), which repeats its last step, instead of agent.update(*args).
+#
+# Agents with interval 1 always update. The others that are due update
+# oldest first while the tick's time budget lasts, which starts counting
+# once the agents that had to update have; the rest stay due and go first
+# on the next tick. However tight the budget, at least enough of them
+# update each tick that every agent gets its turn within max_wait ticks of
+# coming due. So the AI's time per tick stays around the budget however
+# many agents there are far away, and none of them freezes.
+#
+#     ai = AIScheduler(lambda enemy, player: 1 if near(enemy, player) else 4, budget_ms=2)
+#     ai.run(enemies, player)  # once per tick
+#     ai.used, ai.usage()  # seconds the last tick took, fraction of the budget
+#     ai.reset()  # new level: forget the ticks, so a seed replays the same
+import math
+from time import perf_counter
+
+
+class AIScheduler:
+    def __init__(self, lod, budget_ms=None, max_wait=30):
+        self.lod = lod
+        self.budget = None if budget_ms is None else budget_ms / 1000  # seconds per tick, None for no limit
+        self.max_wait = max_wait
+        self.tick = 0
+        self.spread = 0  # staggers agents seen for the first time
+        self.used = 0.0  # seconds spent on the last tick
+        self.updated = 0  # full updates on the last tick
+        self.coasted = 0  # agents only moved on
+        self.deferred = 0  # due, but left for the next tick by the budget
+
+    # Start counting ticks over; call it when the agents are (re)spawned
+    def reset(self):
+        self.tick = 0
+        self.spread = 0
+
+    # Agents keep their next due tick in agent.ai_due; set it to None when
+    # an agent is (re)spawned
+    def run(self, agents, *args):
+        start = perf_counter()
+        self.tick += 1
+        tick = self.tick
+        lod = self.lod
+        due = []
+        updated = coasted = scheduled = 0
+        for agent in agents:
+            interval = lod(agent, *args)
+            if interval <= 1:
+                agent.update(*args)
+                agent.ai_due = tick + 1
+                updated += 1
+                continue
+            scheduled += 1
+            if agent.ai_due is None:
+                agent.ai_due = tick + self.spread % interval
+                self.spread += 1
+            if agent.ai_due <= tick:
+                due.append((agent.ai_due, interval, agent))
+            else:
+                agent.coast()
+                coasted += 1
+
+        deferred = 0
+        if due:
+            due.sort(key=lambda entry: entry[0])
+            budget = self.budget
+            minimum = math.ceil(scheduled / self.max_wait)
+            budget_start = perf_counter()
+            for count, (_, interval, agent) in enumerate(due):
+                if budget is not None and count >= minimum and perf_counter() - budget_start >= budget:
+                    agent.coast()
+                    deferred += 1
+                    continue
+                agent.update(*args)
+                agent.ai_due = tick + interval
+                updated += 1
+
+        self.updated = updated
+        self.coasted = coasted + deferred
+        self.deferred = deferred
+        self.used = perf_counter() - start
+
+    # Fraction of the budget the last tick used (above 1 when the agents
+    # that update every tick alone take longer), None without a budget
+    def usage(self):
+        if self.budget is None:
+            return None
+        return self.used / self.budget
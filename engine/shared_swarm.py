@@ -0,0 +1,238 @@
+# Swarm stepped by worker processes over shared memory.
+# The slime arrays live in one multiprocessing.shared_memory block that the
+# main process and every worker map, so nothing is copied between them: the
+# main process adds, damages and draws slimes straight from the arrays, the
+# workers move them. Positions are double-buffered. A step runs in two
+# phases, each split between the workers:
+#
+#   move      each worker takes a slice of the slimes, copies their front
+#             positions into the back buffer and chases / pushes them out
+#             of obstacles there (every slime on its own, so any split will
+#             do)
+#   separate  each worker owns a vertical strip of the world, cut so the
+#             strips hold about as many slimes each. It reads the back
+#             buffer, finds the overlaps of its own slimes with every slime
+#             up to one slime width past its strip's edges, and writes the
+#             pushed positions of its own slimes to the front buffer.
+#
+# No slime is written by two workers and the separate phase only reads
+# positions every move has finished with, so the result is the same as
+# Swarm.step's, boundaries between strips included. Below min_parallel
+# slimes the main process steps them itself, which is faster than the
+# round trips.
+#
+#     swarm = SharedSwarm(24, 24, workers=8)
+#     ...same as Swarm...
+#     swarm.close()  # stop the workers and free the memory
+import atexit
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine.swarm import Swarm, chase, overlapping_pairs, push_out
+
+# name -> dtype, in the order they sit in the block. x and y are the front
+# buffer (what is drawn), back_x and back_y the one a step moves slimes in.
+FIELDS = [
+    ("x", np.int64),
+    ("y", np.int64),
+    ("back_x", np.int64),
+    ("back_y", np.int64),
+    ("speed", np.int64),
+    ("max_radius", np.int64),
+    ("health", np.float64),
+]
+
+
+# Arrays of `capacity` slimes each over the shared block `memory`
+def map_arrays(memory, capacity):
+    arrays = {}
+    offset = 0
+    for name, dtype in FIELDS:
+        arrays[name] = np.ndarray(capacity, dtype=dtype, buffer=memory.buf, offset=offset)
+        offset += capacity * np.dtype(dtype).itemsize
+    return arrays
+
+
+def block_size(capacity):
+    return sum(capacity * np.dtype(dtype).itemsize for _, dtype in FIELDS)
+
+
+# The parts of a FlowField chase() reads, small enough to send to workers
+class FieldSteps:
+    def __init__(self, field):
+        self.cell_size = field.cell_size
+        self.columns = field.columns
+        self.rows = field.rows
+        self.has_step = bytes(field.has_step)
+        self.step_x = field.step_x.tobytes()
+        self.step_y = field.step_y.tobytes()
+
+
+# Strip edges splitting x into `parts` runs of about the same number of
+# slimes. Every process works them out from the same positions, so they
+# agree on who owns which slime.
+def strip_edges(x, parts):
+    n = len(x)
+    cuts = [n * part // parts for part in range(1, parts)]
+    inner = np.partition(x, cuts)[cuts] if cuts else []
+    low, high = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+    return [low, *[int(edge) for edge in inner], high]
+
+
+# Move phase: chase and push out this worker's slice of the slimes in the
+# back buffer
+def move(arrays, n, part, parts, px, py, field, obstacles, width, height):
+    start, end = n * part // parts, n * (part + 1) // parts
+    x, y = arrays["back_x"][start:end], arrays["back_y"][start:end]
+    x[:] = arrays["x"][start:end]
+    y[:] = arrays["y"][start:end]
+    speed = arrays["speed"][start:end]
+    chase(x, y, speed, arrays["max_radius"][start:end], px, py, field, width, height)
+    push_out(x, y, speed, width, height, obstacles)
+
+
+# Separate phase: push this worker's strip of slimes off the slimes they
+# overlap, from the back buffer into the front one
+def separate_strip(arrays, n, part, parts, width, height):
+    x, y = arrays["back_x"][:n], arrays["back_y"][:n]
+    edges = strip_edges(x, parts)
+    low, high = edges[part], edges[part + 1]
+    nearby = np.flatnonzero((x >= low - width) & (x < high + width))
+    x, y = x[nearby], y[nearby]
+    own = (x >= low) & (x < high)
+    i, j = overlapping_pairs(x, y, width, height)
+    keep = own[i]
+    i, j = i[keep], j[keep]
+    push_x = np.bincount(i, weights=np.where(x[i] < x[j], -1, 1), minlength=len(nearby)).astype(np.int64)
+    push_y = np.bincount(i, weights=np.where(y[i] < y[j], -1, 1), minlength=len(nearby)).astype(np.int64)
+    mine = nearby[own]
+    speed = arrays["speed"][mine]
+    arrays["x"][mine] = x[own] + push_x[own] * speed
+    arrays["y"][mine] = y[own] + push_y[own] * speed
+
+
+# Worker process: runs the main process's commands from `connection`,
+# answering each once it is done
+def work(connection, part, parts, width, height):
+    memory = arrays = None
+    field = None
+    obstacles = []
+    while True:
+        command, *args = connection.recv()
+        if command == "map":
+            name, capacity = args
+            if memory is not None:
+                arrays = None
+                memory.close()
+            memory = shared_memory.SharedMemory(name=name)
+            arrays = map_arrays(memory, capacity)
+        elif command == "field":
+            field = args[0]
+        elif command == "obstacles":
+            obstacles = args[0]
+        elif command == "move":
+            n, px, py = args
+            move(arrays, n, part, parts, px, py, field, obstacles, width, height)
+        elif command == "separate":
+            separate_strip(arrays, args[0], part, parts, width, height)
+        elif command == "stop":
+            break
+        connection.send(None)
+    arrays = None
+    if memory is not None:
+        memory.close()
+
+
+class SharedSwarm(Swarm):
+    def __init__(self, width, height, workers=None, capacity=1024, min_parallel=2000):
+        self.width = width
+        self.height = height
+        self.count = 0
+        self.views = []
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self.memory = None
+        self.connections = []  # to the workers, started on the first parallel step
+        self.processes = []
+        self.sent_field = None  # (field, version) the workers have
+        self.sent_obstacles = None  # the obstacle list the workers have
+        self._map(capacity)
+        atexit.register(self.close)
+
+    # Move the arrays into a new block of `capacity` slimes
+    def _map(self, capacity):
+        old = self.memory
+        memory = shared_memory.SharedMemory(create=True, size=block_size(capacity))
+        arrays = map_arrays(memory, capacity)
+        if old is not None:
+            for name, _ in FIELDS:
+                arrays[name][:self.count] = getattr(self, name)[:self.count]
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.memory = memory
+        self.capacity = capacity
+        self.broadcast("map", memory.name, capacity)
+        if old is not None:
+            old.close()
+            old.unlink()
+
+    def _grow(self):
+        self._map(self.capacity * 2)
+
+    def start_workers(self):
+        context = multiprocessing.get_context("spawn")
+        for part in range(self.workers):
+            ours, theirs = context.Pipe()
+            process = context.Process(target=work, args=(theirs, part, self.workers, self.width, self.height), daemon=True)
+            process.start()
+            self.connections.append(ours)
+            self.processes.append(process)
+        self.broadcast("map", self.memory.name, self.capacity)
+
+    # Send a command to every worker and wait until they have all done it
+    def broadcast(self, command, *args):
+        for connection in self.connections:
+            connection.send((command, *args))
+        for connection in self.connections:
+            connection.recv()
+
+    # obstacles are sent to the workers when a different list is passed, so
+    # pass the same list from tick to tick and a new one when they change
+    def step(self, player_rect, obstacles, field=None):
+        n = self.count
+        if n == 0:
+            return
+        if n < self.min_parallel or self.workers < 2:
+            super().step(player_rect, obstacles, field)
+            return
+        if not self.connections:
+            self.start_workers()
+        version = None if field is None else (field, field.version)
+        if self.sent_field != version:
+            self.broadcast("field", None if field is None else FieldSteps(field))
+            self.sent_field = version
+        # Compared by identity: the masks' counts are arrays, which == does
+        # not compare as a whole. Holding on to the list keeps its id unique.
+        if self.sent_obstacles is not obstacles:
+            self.broadcast("obstacles", list(obstacles))
+            self.sent_obstacles = obstacles
+        self.broadcast("move", n, player_rect.x, player_rect.y)
+        self.broadcast("separate", n)
+
+    # Stop the workers and free the shared block
+    def close(self):
+        for connection in self.connections:
+            connection.send(("stop",))
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+        if self.memory is not None:
+            for name, _ in FIELDS:
+                setattr(self, name, None)
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
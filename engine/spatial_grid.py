@@ -0,0 +1,58 @@
+# Uniform-grid spatial index.
+# Each item is bucketed by the cell holding its rect's centre, so a query only
+# looks at the handful of cells around the query rect instead of every item.
+
+
+class SpatialGrid:
+    def __init__(self, cell_size=96):
+        self.cell_size = cell_size
+        self.cells = {}
+        # Largest half-size of any indexed rect; queries grow by this much so
+        # items centred in a neighbouring cell are still found
+        self.reach_x = 0
+        self.reach_y = 0
+
+    def clear(self):
+        self.cells.clear()
+        self.reach_x = 0
+        self.reach_y = 0
+
+    def insert(self, item, rect):
+        size = self.cell_size
+        key = (rect.centerx // size, rect.centery // size)
+        bucket = self.cells.get(key)
+        if bucket is None:
+            self.cells[key] = [item]
+        else:
+            bucket.append(item)
+        if rect.width > self.reach_x * 2:
+            self.reach_x = (rect.width + 1) // 2
+        if rect.height > self.reach_y * 2:
+            self.reach_y = (rect.height + 1) // 2
+
+    # Re-index every item from its current rect (call once per frame)
+    def rebuild(self, items):
+        self.clear()
+        for item in items:
+            self.insert(item, item.rect)
+
+    # Candidates whose indexed rect touches the rect grown by `margin` pixels.
+    # Items that moved since the last rebuild may be missed by up to `margin`,
+    # so callers still do the exact colliderect on the current rects.
+    def query(self, rect, margin=0):
+        size = self.cell_size
+        cells = self.cells
+        grow_x = self.reach_x + margin
+        grow_y = self.reach_y + margin
+        x0 = (rect.left - grow_x) // size
+        x1 = (rect.right + grow_x) // size
+        y0 = (rect.top - grow_y) // size
+        y1 = (rect.bottom + grow_y) // size
+
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found += bucket
+        return found
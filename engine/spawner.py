@@ -0,0 +1,140 @@
+# Spawning: where things go and when they come in.
+# PoissonDiskSampler scatters boxes of one size at random over an area so
+# that none of them overlap each other or a blocked rect. Two boxes that do
+# not overlap are at least a box apart on one axis, so a grid of box-sized
+# cells holds at most one box per cell, and a box can only overlap the ones
+# in the 3x3 cells around it. The sampler visits the cells in random order
+# and throws a few darts at each empty one, keeping the first that fits, so
+# the work stays bounded and it still packs the area about as full as
+# random placement can. Past that it returns fewer points than asked for.
+#
+# WaveSpawner puts waves of spawn points into play a wave at a time, and
+# spreads a large wave over several ticks: each tick it spawns until the
+# tick's time budget is used.
+#
+#     sampler = PoissonDiskSampler(rng, area, 72, 72)
+#     for tree in trees:
+#         sampler.block(tree)
+#     spawner = WaveSpawner(spawn_slime, budget_ms=2)
+#     spawner.add_wave(sampler.sample(500))
+#     spawner.add_wave(sampler.sample(500), delay=600)
+#     spawner.update()  # once per tick
+from collections import deque
+from time import perf_counter
+
+import pygame
+
+
+class PoissonDiskSampler:
+    # Points are box top-lefts within area (edges included)
+    def __init__(self, rng, area, width, height):
+        self.rng = rng
+        self.area = pygame.Rect(area)
+        self.width = width
+        self.height = height
+        self.cells = {}  # (column, row) -> the point in that cell
+        self.blocked = {}  # (column, row) -> blocked rects a box there may touch
+
+    def cell(self, x, y):
+        return x // self.width, y // self.height
+
+    # Keep boxes off rect
+    def block(self, rect):
+        rect = pygame.Rect(rect)
+        # Top-lefts of the boxes that would overlap rect
+        left, top = self.cell(rect.left - self.width + 1, rect.top - self.height + 1)
+        right, bottom = self.cell(rect.right - 1, rect.bottom - 1)
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                self.blocked.setdefault((column, row), []).append(rect)
+
+    def fits(self, x, y):
+        column, row = self.cell(x, y)
+        for rect in self.blocked.get((column, row), ()):
+            if x < rect.right and x + self.width > rect.left and y < rect.bottom and y + self.height > rect.top:
+                return False
+        cells = self.cells
+        for other_column in (column - 1, column, column + 1):
+            for other_row in (row - 1, row, row + 1):
+                other = cells.get((other_column, other_row))
+                if other is not None and abs(other[0] - x) < self.width and abs(other[1] - y) < self.height:
+                    return False
+        return True
+
+    # Claim the box at (x, y); it may overlap boxes already placed
+    def add(self, x, y):
+        self.cells[self.cell(x, y)] = (x, y)
+
+    # Up to count new points, `attempts` darts per cell
+    def sample(self, count, attempts=5):
+        area, width, height, randint = self.area, self.width, self.height, self.rng.randint
+        left, top = self.cell(area.left, area.top)
+        right, bottom = self.cell(area.right, area.bottom)
+        cells = [(column, row) for column in range(left, right + 1) for row in range(top, bottom + 1)]
+        self.rng.shuffle(cells)
+        points = []
+        for column, row in cells:
+            if len(points) == count:
+                break
+            if (column, row) in self.cells:
+                continue
+            x0, y0 = max(column * width, area.left), max(row * height, area.top)
+            x1, y1 = min(column * width + width - 1, area.right), min(row * height + height - 1, area.bottom)
+            for _ in range(attempts):
+                x, y = randint(x0, x1), randint(y0, y1)
+                if self.fits(x, y):
+                    self.add(x, y)
+                    points.append((x, y))
+                    break
+        return points
+
+
+class WaveSpawner:
+    # spawn(x, y) puts one thing in play. budget_ms=None spawns every
+    # started wave on the tick it starts.
+    def __init__(self, spawn, budget_ms=None):
+        self.spawn = spawn
+        self.budget = None if budget_ms is None else budget_ms / 1000  # seconds per tick
+        self.tick = 0
+        self.waves = deque()  # (tick it starts on, points), in that order
+        self.pending = deque()  # points of started waves still to spawn
+        self.spawned = 0  # on the last tick
+        self.used = 0.0  # seconds the last tick spent spawning
+
+    # Queue a wave starting delay ticks after the last wave still waiting to
+    # start, or after now when there is none. With no delay it starts now.
+    def add_wave(self, points, delay=0):
+        start = (self.waves[-1][0] if self.waves else self.tick) + delay
+        if start <= self.tick:
+            self.pending.extend(points)
+        else:
+            self.waves.append((start, points))
+
+    def clear(self):
+        self.waves.clear()
+        self.pending.clear()
+
+    # True while there is anything left to spawn
+    def busy(self):
+        return bool(self.waves or self.pending)
+
+    def update(self):
+        start = perf_counter()
+        self.tick += 1
+        while self.waves and self.waves[0][0] <= self.tick:
+            self.pending.extend(self.waves.popleft()[1])
+        pending, spawn, budget = self.pending, self.spawn, self.budget
+        spawned = 0
+        while pending:
+            # At least one a tick, so a wave always finishes
+            if budget is not None and spawned and perf_counter() - start >= budget:
+                break
+            spawn(*pending.popleft())
+            spawned += 1
+        self.spawned = spawned
+        self.used = perf_counter() - start
+
+    # Spawn what the started waves have left, all at once
+    def flush(self):
+        while self.pending:
+            self.spawn(*self.pending.popleft())
@@ -0,0 +1,76 @@
+# Lazy start-up for the games.
+# Importing a game opens no window and touches no sound card: its run()
+# brings the display up, and the mixer and fonts start the first time
+# something plays a sound or renders text. Every step is timed from when
+# this module was first imported (the games import it before setting up
+# anything of their own), and first_frame() after the first flip records
+# the time to first frame.
+#
+#     def run():
+#         screen = startup.display((800, 600), "Title")
+#         while running:
+#             ...
+#             pygame.display.flip()
+#             startup.first_frame()    # prints the breakdown with STARTUP=1
+import os
+import time
+
+import pygame
+
+START = time.perf_counter()
+marks = []  # (step, seconds since START)
+first_frame_time = None
+
+
+def mark(step):
+    marks.append((step, time.perf_counter() - START))
+
+
+# No window and no sound; call before the display or the mixer start
+def use_dummy_drivers():
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+
+# The window, opened on the first call
+def display(size, caption=None):
+    screen = pygame.display.get_surface()
+    if screen is None or screen.get_size() != tuple(size):
+        screen = pygame.display.set_mode(size)
+        mark("display")
+    if caption is not None:
+        pygame.display.set_caption(caption)
+    return screen
+
+
+# Starts the mixer on the first call. False when there is no audio device,
+# in which case the game runs silent.
+def mixer():
+    if pygame.mixer.get_init():
+        return True
+    try:
+        pygame.mixer.init()
+    except pygame.error:
+        return False
+    mark("mixer")
+    return True
+
+
+def fonts():
+    if not pygame.font.get_init():
+        pygame.font.init()
+        mark("fonts")
+
+
+def first_frame():
+    global first_frame_time
+    if first_frame_time is not None:
+        return
+    mark("first frame")
+    first_frame_time = marks[-1][1]
+    if os.environ.get("STARTUP") == "1":
+        print(report())
+
+
+def report():
+    return "startup: " + ", ".join(f"{step} {seconds * 1000:.1f} ms" for step, seconds in marks)
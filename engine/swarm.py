@@ -0,0 +1,217 @@
+# Structure-of-arrays slime swarm.
+# Positions, speeds, health and chase radius live in contiguous NumPy arrays
+# and chase / obstacle push-out / neighbour avoidance run as batch operations.
+# Sprites only keep an index into the arrays and are used for drawing.
+# Obstacles can come with the solid pixels of their mask (see solid_counts),
+# so slimes collide with a tree's trunk and crown, not its bounding box, as
+# the sprite backend's StaticCollisionIndex does.
+import numpy as np
+import pygame
+
+
+# Move every slime within its chase radius one step toward the player.
+# With a flow field, slimes whose centre (x + width // 2, y + height // 2)
+# falls in a cell with a step follow it instead of heading straight over.
+def chase(x, y, speed, max_radius, px, py, field=None, width=0, height=0):
+    dx = px - x
+    dy = py - y
+    chasing = dx * dx + dy * dy < max_radius * max_radius
+    step = speed * chasing
+    step_x, step_y = np.sign(dx), np.sign(dy)
+    if field is not None:
+        field_x, field_y, has_step = field_steps(field, x + width // 2, y + height // 2)
+        step_x = np.where(has_step, field_x, step_x)
+        step_y = np.where(has_step, field_y, step_y)
+    x += step_x * step
+    y += step_y * step
+
+
+# The flow field's step at each point, read straight from its byte arrays
+def field_steps(field, x, y):
+    column = x // field.cell_size
+    row = y // field.cell_size
+    inside = (column >= 0) & (column < field.columns) & (row >= 0) & (row < field.rows)
+    cell = np.where(inside, row * field.columns + column, 0)
+    has_step = (np.frombuffer(field.has_step, dtype=np.uint8)[cell] == 1) & inside
+    return np.frombuffer(field.step_x, dtype=np.int8)[cell], np.frombuffer(field.step_y, dtype=np.int8)[cell], has_step
+
+
+# Solid pixel counts of a mask for push_out: entry [row, column] is the
+# number of solid pixels above row and left of column, so the count inside
+# any box of the mask takes four lookups
+def solid_counts(mask):
+    surface = mask.to_surface(setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 0))
+    solid = pygame.surfarray.array_alpha(surface).T > 0
+    counts = np.zeros((solid.shape[0] + 1, solid.shape[1] + 1), dtype=np.int32)
+    counts[1:, 1:] = solid.cumsum(axis=0).cumsum(axis=1)
+    return counts
+
+
+# Shove slimes that overlap an obstacle one speed step out of it, along the
+# axis with the least overlap and out of the nearer side.
+# An obstacle is a rect, solid all over, or a (rect, solid_counts(mask))
+# pair, which slimes only hit when their box covers a solid pixel.
+def push_out(x, y, speed, width, height, obstacles):
+    for obstacle in obstacles:
+        rect, counts = obstacle if isinstance(obstacle, tuple) else (obstacle, None)
+        hit = (x < rect.right) & (x + width > rect.left) & (y < rect.bottom) & (y + height > rect.top)
+        if not hit.any():
+            continue
+        near = np.flatnonzero(hit)
+        nx, ny = x[near], y[near]
+        if counts is not None:
+            # The overlap of each box with the rect, in the mask's pixels
+            left = np.maximum(nx - rect.x, 0)
+            right = np.minimum(nx + width - rect.x, rect.width)
+            top = np.maximum(ny - rect.y, 0)
+            bottom = np.minimum(ny + height - rect.y, rect.height)
+            solid = counts[bottom, right] - counts[top, right] - counts[bottom, left] + counts[top, left] > 0
+            near, nx, ny = near[solid], nx[solid], ny[solid]
+        # How far each box would have to go to clear the rect on each side
+        left, right = nx + width - rect.left, rect.right - nx
+        up, down = ny + height - rect.top, rect.bottom - ny
+        along_x = np.minimum(left, right) <= np.minimum(up, down)
+        step = speed[near]
+        x[near] += np.where(along_x, np.where(left < right, -step, step), 0)
+        y[near] += np.where(along_x, 0, np.where(up < down, -step, step))
+
+
+# Index pairs (i, j), i != j, of overlapping slimes of size width x height.
+# Slimes are bucketed into cells at least as large as a slime, so overlapping
+# pairs always sit in the same or adjacent cells; the 3x3 neighbourhood of
+# every slime is looked up in a table of per-cell ranges over the sorted slimes.
+def overlapping_pairs(x, y, width, height):
+    n = len(x)
+    if n < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    cell = max(width, height)
+    cx = x // cell
+    cy = y // cell
+    cx -= cx.min() - 1  # one empty cell of padding on every side so
+    cy -= cy.min() - 1  # neighbour lookups never wrap into another column
+    rows = int(cy.max()) + 2
+    keys = cx * rows + cy
+    order = np.argsort(keys, kind="stable")
+    offsets = np.array([ox * rows + oy for ox in (-1, 0, 1) for oy in (-1, 0, 1)])
+    probes = (keys[None, :] + offsets[:, None]).ravel()
+    owners = np.tile(np.arange(n), len(offsets))
+
+    cells = (int(cx.max()) + 2) * rows
+    if cells <= 16 * n + 4096:
+        # Dense table: O(1) range lookup per probe
+        cell_count = np.bincount(keys, minlength=cells)
+        cell_start = np.cumsum(cell_count) - cell_count
+        start = cell_start[probes]
+        counts = cell_count[probes]
+    else:
+        # Slimes spread over a huge area: binary search the sorted keys instead
+        sorted_keys = keys[order]
+        start = np.searchsorted(sorted_keys, probes, "left")
+        counts = np.searchsorted(sorted_keys, probes, "right") - start
+
+    i = np.repeat(owners, counts)
+    first = np.repeat(start - (np.cumsum(counts) - counts), counts)
+    j = order[np.arange(len(i)) + first]
+
+    keep = (i != j) & (np.abs(x[i] - x[j]) < width) & (np.abs(y[i] - y[j]) < height)
+    return i[keep], j[keep]
+
+
+# Push overlapping slimes apart, one speed step per overlapping neighbour.
+# All pushes are computed from the same snapshot of positions.
+def separate(x, y, speed, width, height):
+    i, j = overlapping_pairs(x, y, width, height)
+    if len(i) == 0:
+        return
+    n = len(x)
+    push_x = np.where(x[i] < x[j], -1, 1)
+    push_y = np.where(y[i] < y[j], -1, 1)
+    x += np.bincount(i, weights=push_x, minlength=n).astype(np.int64) * speed
+    y += np.bincount(i, weights=push_y, minlength=n).astype(np.int64) * speed
+
+
+class Swarm:
+    def __init__(self, width, height, capacity=64):
+        self.width = width
+        self.height = height
+        self.count = 0
+        self.views = []
+        self.x = np.zeros(capacity, dtype=np.int64)
+        self.y = np.zeros(capacity, dtype=np.int64)
+        self.speed = np.zeros(capacity, dtype=np.int64)
+        self.max_radius = np.zeros(capacity, dtype=np.int64)
+        self.health = np.zeros(capacity, dtype=np.float64)
+
+    def _grow(self):
+        for name in ("x", "y", "speed", "max_radius", "health"):
+            old = getattr(self, name)
+            new = np.zeros(len(old) * 2, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    # Add one slime and return its slot; `view` is the sprite drawn for it
+    def add(self, view, x, y, speed, max_radius, health):
+        if self.count == len(self.x):
+            self._grow()
+        index = self.count
+        self.x[index] = x
+        self.y[index] = y
+        self.speed[index] = speed
+        self.max_radius[index] = max_radius
+        self.health[index] = health
+        self.views.append(view)
+        self.count += 1
+        return index
+
+    # Drop every slime, keeping the arrays for the next wave
+    def clear(self):
+        self.count = 0
+        self.views = []
+
+    # One simulation step for every slime, optionally along a FlowField.
+    # obstacles are as for push_out.
+    def step(self, player_rect, obstacles, field=None):
+        n = self.count
+        if n == 0:
+            return
+        x, y, speed = self.x[:n], self.y[:n], self.speed[:n]
+        chase(x, y, speed, self.max_radius[:n], player_rect.x, player_rect.y, field, self.width, self.height)
+        push_out(x, y, speed, self.width, self.height, obstacles)
+        separate(x, y, speed, self.width, self.height)
+
+    # Copy array positions into the sprite rects used for drawing
+    def sync_views(self):
+        n = self.count
+        for view, x, y in zip(self.views, self.x[:n].tolist(), self.y[:n].tolist()):
+            view.rect.topleft = (x, y)
+
+    # Views of slimes whose rect touches rect grown by margin pixels
+    def views_touching(self, rect, margin=0):
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        hit = ((x < rect.right + margin) & (x + self.width > rect.left - margin)
+               & (y < rect.bottom + margin) & (y + self.height > rect.top - margin))
+        views = self.views
+        return [views[k] for k in np.flatnonzero(hit).tolist()]
+
+    # Take amounts off the health of the slimes at indices; repeated
+    # indices add up
+    def damage(self, indices, amounts):
+        np.subtract.at(self.health, indices, amounts)
+
+    # Compact the arrays, dropping slimes with no health left
+    def remove_dead(self):
+        n = self.count
+        alive = self.health[:n] > 0
+        if alive.all():
+            return
+        keep = np.flatnonzero(alive)
+        for name in ("x", "y", "speed", "max_radius", "health"):
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        self.views = [self.views[k] for k in keep.tolist()]
+        for index, view in enumerate(self.views):
+            view.index = index
+        self.count = len(keep)
@@ -0,0 +1,81 @@
+# Cached text rendering.
+# Fonts are created once per (name, size) and rendered surfaces are kept in an
+# LRU cache keyed by (text, font, color, antialias), so static strings are
+# rasterized once and changing values only when they actually change.
+from collections import OrderedDict
+
+import pygame
+
+from engine import startup
+
+
+class TextRenderer:
+    def __init__(self, max_surfaces=256):
+        self.max_surfaces = max_surfaces
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Font registry: SysFont/Font lookups happen once per (name, size)
+    def get_font(self, name=None, size=30, sysfont=False):
+        key = (name, size, sysfont)
+        font = self.fonts.get(key)
+        if font is None:
+            startup.fonts()
+            if sysfont:
+                font = pygame.font.SysFont(name, size)
+            else:
+                font = pygame.font.Font(name, size)
+            self.fonts[key] = font
+        return font
+
+    def rasterize(self, text, font, color, antialias=True):
+        self.misses += 1
+        return font.render(text, antialias, color)
+
+    def render(self, text, font, color, antialias=True):
+        key = (text, font, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = self.rasterize(text, font, color, antialias)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "cached_surfaces": len(self.surfaces),
+            "fonts": len(self.fonts),
+        }
+
+
+# A piece of text built from changing values, e.g. "Score: {}".
+# It keeps its own surface and re-renders only when the values change, so a
+# ticking score does not flood the shared LRU cache with stale strings.
+class TextLabel:
+    def __init__(self, renderer, template, font, color, antialias=True):
+        self.renderer = renderer
+        self.template = template
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.values = None
+        self.surface = None
+
+    def render(self, *values):
+        if values == self.values:
+            self.renderer.hits += 1
+            return self.surface
+        self.values = values
+        self.surface = self.renderer.rasterize(self.template.format(*values), self.font, self.color, self.antialias)
+        return self.surface
@@ -0,0 +1,139 @@
+# Tile-based worlds bigger than the window.
+# A tileset image is sliced into tiles once; the world is a grid of tile
+# indices that is drawn into chunk surfaces (several tiles square) the first
+# time a chunk comes into view. Static decorations such as trees are baked
+# into the chunks they overlap. A Camera follows the player, and each frame
+# only the chunks it sees are copied to the screen, so the draw cost depends
+# on the window size, not on the size of the world.
+from collections import OrderedDict
+
+import pygame
+
+
+# Cut a tileset into tile_size squares, row by row, optionally scaled up
+def slice_tileset(tileset, tile_size, scale=1):
+    tiles = []
+    for y in range(0, tileset.get_height() - tile_size + 1, tile_size):
+        for x in range(0, tileset.get_width() - tile_size + 1, tile_size):
+            tile = tileset.subsurface((x, y, tile_size, tile_size))
+            if scale != 1:
+                tile = pygame.transform.scale(tile, (tile_size * scale, tile_size * scale))
+            tiles.append(tile)
+    return tiles
+
+
+# Viewport into the world, in world coordinates
+class Camera:
+    def __init__(self, view_width, view_height, world_width, world_height):
+        self.rect = pygame.Rect(0, 0, view_width, view_height)
+        self.world_rect = pygame.Rect(0, 0, world_width, world_height)
+
+    # Centre on a point, kept inside the world. Returns True if the view moved.
+    def follow(self, center):
+        old = self.rect.topleft
+        self.rect.center = center
+        self.rect.clamp_ip(self.world_rect)
+        return self.rect.topleft != old
+
+    def to_screen(self, rect):
+        return rect.move(-self.rect.x, -self.rect.y)
+
+    def visible(self, rect):
+        return self.rect.colliderect(rect)
+
+
+class TileMap:
+    # columns x rows tiles; chunk_tiles tiles per chunk side; at most
+    # max_chunks chunk surfaces are kept, least recently seen dropped first
+    def __init__(self, tiles, columns, rows, chunk_tiles=8, max_chunks=48):
+        self.tiles = tiles
+        self.tile_size = tiles[0].get_width()
+        self.columns = columns
+        self.rows = rows
+        self.cells = [0] * (columns * rows)
+        self.chunk_tiles = chunk_tiles
+        self.chunk_size = chunk_tiles * self.tile_size
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+        self.decorations = {}  # chunk key -> [(surface, world rect)]
+        self.view_surface = None
+        self.view_position = None
+        self.rect = pygame.Rect(0, 0, columns * self.tile_size, rows * self.tile_size)
+
+    # Pick every tile at random from `choices`, weighted like random.choices
+    def fill_random(self, rng, choices, weights=None):
+        self.cells = rng.choices(choices, weights, k=self.columns * self.rows)
+        self.invalidate()
+
+    # Bake a static surface into every chunk its rect overlaps
+    def add_decoration(self, surface, rect):
+        for key in self.chunk_keys(rect):
+            self.decorations.setdefault(key, []).append((surface, rect))
+            self.chunks.pop(key, None)
+        self.view_position = None
+
+    def clear_decorations(self):
+        self.decorations.clear()
+        self.invalidate()
+
+    def invalidate(self):
+        self.chunks.clear()
+        self.view_position = None
+
+    def chunk_keys(self, rect):
+        size = self.chunk_size
+        for cy in range(max(0, rect.top // size), (min(rect.bottom, self.rect.bottom) - 1) // size + 1):
+            for cx in range(max(0, rect.left // size), (min(rect.right, self.rect.right) - 1) // size + 1):
+                yield cx, cy
+
+    def render_chunk(self, key):
+        cx, cy = key
+        tile_size = self.tile_size
+        first_column, first_row = cx * self.chunk_tiles, cy * self.chunk_tiles
+        columns = min(self.chunk_tiles, self.columns - first_column)
+        rows = min(self.chunk_tiles, self.rows - first_row)
+        chunk = pygame.Surface((columns * tile_size, rows * tile_size)).convert()
+        blits = []
+        for row in range(rows):
+            cells = self.cells[(first_row + row) * self.columns + first_column:][:columns]
+            blits.extend((self.tiles[tile], (column * tile_size, row * tile_size)) for column, tile in enumerate(cells))
+        chunk.blits(blits, doreturn=False)
+        origin_x, origin_y = cx * self.chunk_size, cy * self.chunk_size
+        for surface, rect in self.decorations.get(key, ()):
+            chunk.blit(surface, (rect.x - origin_x, rect.y - origin_y))
+        return chunk
+
+    def chunk(self, key):
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = self.render_chunk(key)
+            if len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    # Render every chunk in rect (the whole world by default) ahead of time
+    def prerender(self, rect=None):
+        for key in self.chunk_keys(rect or self.rect):
+            self.chunk(key)
+
+    # Draw the chunks the camera sees onto surface, offset to screen space
+    def draw(self, surface, camera):
+        view = camera.rect
+        size = self.chunk_size
+        surface.blits([
+            (self.chunk(key), (key[0] * size - view.x, key[1] * size - view.y))
+            for key in self.chunk_keys(view)
+        ], doreturn=False)
+
+    # The camera's view as one screen-sized surface. It is redrawn only when
+    # the camera has moved, so a still camera costs nothing here.
+    def view(self, camera):
+        if self.view_surface is None or self.view_surface.get_size() != camera.rect.size:
+            self.view_surface = pygame.Surface(camera.rect.size).convert()
+            self.view_position = None
+        if self.view_position != camera.rect.topleft:
+            self.draw(self.view_surface, camera)
+            self.view_position = camera.rect.topleft
+        return self.view_surface
@@ -1,12 +1,18 @@
+import os
+import sys
+
 import pygame
 
-# Initialize Pygame
-pygame.init()
+# Shared helpers live in the engine package one folder up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import startup
+from engine.profiler import FrameProfiler
 
 # Screen setup
 screen_width, screen_height = 800, 600
-screen = pygame.display.set_mode((screen_width, screen_height))
-pygame.display.set_caption("Enhanced Player Movement and Collision")
+
+# Frame profiler: set PROFILE=1 or press F3 in game, F4 exports a trace
+profiler = FrameProfiler(enabled=os.environ.get("PROFILE") == "1")
 
 # Colors
 WHITE = (255, 255, 255)
@@ -60,77 +66,94 @@ class Player(pygame.sprite.Sprite):
             self.rect.x += self.speed
             self.direction = "right"
 
-# Create sprite groups
-player1 = Player(200, 275, GREEN, {
-    "up": pygame.K_w,
-    "down": pygame.K_s,
-    "left": pygame.K_a,
-    "right": pygame.K_d
-})
-
-player2 = Player(600, 275, BLUE, {
-    "up": pygame.K_UP,
-    "down": pygame.K_DOWN,
-    "left": pygame.K_LEFT,
-    "right": pygame.K_RIGHT
-})
-
-all_sprites = pygame.sprite.Group()
-all_sprites.add(player1, player2)
-
-# Game loop
-clock = pygame.time.Clock()
-running = True
-
-while running:
-    dt = clock.tick(60)  # Delta time in milliseconds (60 FPS)
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-    # Update all sprites
-    keys = pygame.key.get_pressed()
-
-    # Check for same direction movement
-    if player1.direction and player1.direction == player2.direction:
-        player1.speed = min(player1.max_speed, player1.speed + 1)
-        player2.speed = min(player2.max_speed, player2.speed + 1)
-        player1.boosted = True
-        player2.boosted = True
-    else:
-        player1.speed = 5
-        player2.speed = 5
-
-    all_sprites.update(keys, dt)
-
-    # Collision detection
-    if pygame.sprite.collide_rect(player1, player2):
-        if player1.boosted or player2.boosted:  # High-speed collision
-            # Push them apart
-            if player1.rect.centerx < player2.rect.centerx:
-                player1.rect.x -= 50
-                player2.rect.x += 50
-            else:
-                player1.rect.x += 50
-                player2.rect.x -= 50
-
-            if player1.rect.centery < player2.rect.centery:
-                player1.rect.y -= 50
-                player2.rect.y += 50
+# Open the window and play until it is closed
+def run():
+    screen = startup.display((screen_width, screen_height), "Enhanced Player Movement and Collision")
+
+    # Create sprite groups
+    player1 = Player(200, 275, GREEN, {
+        "up": pygame.K_w,
+        "down": pygame.K_s,
+        "left": pygame.K_a,
+        "right": pygame.K_d
+    })
+
+    player2 = Player(600, 275, BLUE, {
+        "up": pygame.K_UP,
+        "down": pygame.K_DOWN,
+        "left": pygame.K_LEFT,
+        "right": pygame.K_RIGHT
+    })
+
+    all_sprites = pygame.sprite.Group()
+    all_sprites.add(player1, player2)
+
+    # Game loop
+    clock = pygame.time.Clock()
+    running = True
+
+    while running:
+        dt = clock.tick(60)  # Delta time in milliseconds (60 FPS)
+
+        with profiler.scope("input"):
+            for event in pygame.event.get():
+                profiler.handle_event(event)
+                if event.type == pygame.QUIT:
+                    running = False
+
+            # Update all sprites
+            keys = pygame.key.get_pressed()
+
+        # Check for same direction movement
+        with profiler.scope("update"):
+            if player1.direction and player1.direction == player2.direction:
+                player1.speed = min(player1.max_speed, player1.speed + 1)
+                player2.speed = min(player2.max_speed, player2.speed + 1)
+                player1.boosted = True
+                player2.boosted = True
             else:
-                player1.rect.y += 50
-                player2.rect.y -= 50
-        else:
-            # Standard collision bounce
-            if player1.rect.colliderect(player2.rect):
-                player1.rect.x -= player1.speed
-                player2.rect.x += player2.speed
-
-    # Draw everything
-    screen.fill(WHITE)
-    all_sprites.draw(screen)
-    pygame.display.flip()
-
-pygame.quit()
-    
\ No newline at end of file
+                player1.speed = 5
+                player2.speed = 5
+
+            all_sprites.update(keys, dt)
+
+        # Collision detection
+        with profiler.scope("collision"):
+            if pygame.sprite.collide_rect(player1, player2):
+                if player1.boosted or player2.boosted:  # High-speed collision
+                    # Push them apart
+                    if player1.rect.centerx < player2.rect.centerx:
+                        player1.rect.x -= 50
+                        player2.rect.x += 50
+                    else:
+                        player1.rect.x += 50
+                        player2.rect.x -= 50
+
+                    if player1.rect.centery < player2.rect.centery:
+                        player1.rect.y -= 50
+                        player2.rect.y += 50
+                    else:
+                        player1.rect.y += 50
+                        player2.rect.y -= 50
+                else:
+                    # Standard collision bounce
+                    if player1.rect.colliderect(player2.rect):
+                        player1.rect.x -= player1.speed
+                        player2.rect.x += player2.speed
+
+        # Draw everything
+        with profiler.scope("draw"):
+            screen.fill(WHITE)
+            all_sprites.draw(screen)
+            profiler.draw_overlay(screen)
+
+        with profiler.scope("flip"):
+            pygame.display.flip()
+            startup.first_frame()
+        profiler.end_frame()
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    run()
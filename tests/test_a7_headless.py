@@ -0,0 +1,74 @@
+import os
+
+os.environ["A7_HEADLESS"] = "1"
+
+import a7_got_attack_on_castle as game
+
+
+# A seed plays out the same when replayed in the same process, as the
+# balance sweeps and reproductions rely on. The world is big enough that
+# some slimes are far off and scheduled less often.
+def test_seed_replays_the_same_in_one_process(monkeypatch):
+    monkeypatch.setattr(game, "WORLD_WIDTH", 2400)
+    monkeypatch.setattr(game, "WORLD_HEIGHT", 1800)
+    monkeypatch.setattr(game, "ENEMY_COUNT_RANGE", (40, 60))
+    seeds = (1, 2, 7)
+    first = [game.run_headless(seed=seed, max_ticks=3000) for seed in seeds]
+    second = [game.run_headless(seed=seed, max_ticks=3000) for seed in seeds]
+    assert first == second
+
+
+# A new level puts the last level's slimes back in their pool, and its own
+# slimes are those same objects, reset
+def test_new_level_reuses_the_last_levels_slimes():
+    game.seed_rngs(5)
+    game.new_level()
+    game.spawner.flush()
+    old = {id(enemy) for enemy in game.enemies}
+    assert old
+    game.new_level()
+    assert not game.enemies
+    assert len(game.enemy_pool(game.Enemy).free) >= len(old)
+    game.spawner.flush()
+    new = {id(enemy) for enemy in game.enemies}
+    assert len(old & new) == min(len(old), len(new))
+
+
+# The shared backend runs level after level: each new level's obstacles
+# reach the workers, though their rects may match the last level's
+def test_shared_backend_plays_two_levels(monkeypatch):
+    monkeypatch.setattr(game, "ENEMY_BACKEND", "shared")
+    monkeypatch.setattr(game, "SWARM_WORKERS", 2)
+    monkeypatch.setattr(game, "ENEMY_COUNT_RANGE", (2500, 2500))
+    monkeypatch.setattr(game, "swarm", None)
+    try:
+        first = game.run_headless(seed=1, max_ticks=200)
+        second = game.run_headless(seed=1, max_ticks=200)
+    finally:
+        game.swarm.close()
+    assert first == second
+
+
+# A slime coasting between AI updates stops at a tree instead of walking
+# into it
+def test_coasting_slime_stops_at_a_tree():
+    game.seed_rngs(3)
+    game.new_level()
+    tree = game.obstacles[0][1]
+    enemy = game.Enemy(0, 0, game.slime_frames)
+    enemy.rect.midright = (tree.left - 1, tree.centery)
+    enemy.velocity = (3, 0)
+    for _ in range(20):
+        enemy.coast()
+        assert not game.colliding_obstacles(enemy.rect)
+    assert enemy.velocity == (0, 0)
+
+
+# A run that makes no progress ends early as stalled instead of running
+# out its tick limit
+def test_run_without_progress_stalls():
+    def idle(player, enemies, castle, tick):
+        return game.PolicyKeys([]), False
+    result = game.run_headless(idle, seed=4, max_ticks=5000, max_idle_ticks=200)
+    assert result["outcome"] == "stalled"
+    assert result["ticks"] == 200
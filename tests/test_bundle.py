@@ -0,0 +1,50 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import pytest
+
+from engine.assets import AssetManager
+from engine.bundle import MAGIC, HEADER, open_bundle, save_bundle
+
+
+@pytest.fixture
+def bundle_path(tmp_path):
+    pygame.display.init()
+    pygame.display.set_mode((64, 64))
+    image = pygame.Surface((8, 8), pygame.SRCALPHA)
+    image.fill((200, 40, 40, 255))
+    image_path = str(tmp_path / "red.png")
+    pygame.image.save(image, image_path)
+    assets = AssetManager()
+    assets.image(image_path)
+    assets.image(image_path, scale=2, flip=True)
+    path = str(tmp_path / "assets.bundle")
+    save_bundle(path, assets)
+    yield path
+    pygame.display.quit()
+
+
+def test_saved_bundle_opens(bundle_path):
+    assert open_bundle(bundle_path) is not None
+    # Nothing but the bundle and its source is left behind
+    assert sorted(os.listdir(os.path.dirname(bundle_path))) == ["assets.bundle", "red.png"]
+
+
+# A bundle cut short anywhere, or with a garbled index, is not used (so the
+# game writes it again) instead of raising
+@pytest.mark.parametrize("keep", [0, 4, len(MAGIC), len(MAGIC) + 3, len(MAGIC) + HEADER.size + 10, -1])
+def test_truncated_bundle_is_ignored(bundle_path, keep):
+    with open(bundle_path, "rb") as file:
+        data = file.read()
+    with open(bundle_path, "wb") as file:
+        file.write(data[:keep])
+    assert open_bundle(bundle_path) is None
+
+
+def test_corrupt_index_is_ignored(bundle_path):
+    with open(bundle_path, "r+b") as file:
+        file.seek(len(MAGIC) + HEADER.size)
+        file.write(b"\xff{not json")
+    assert open_bundle(bundle_path) is None
@@ -0,0 +1,24 @@
+import pygame
+
+from engine.flowfield import FlowField
+
+
+# A chaser in a blocked cell steps out to the nearest free cell, whichever
+# side of the obstacle the target is on
+def test_blocked_cells_step_out_of_the_obstacle():
+    field = FlowField(320, 320, 32)
+    field.block_rect(pygame.Rect(64, 64, 160, 96))  # columns 2-7, rows 2-5
+    field.update(300, 300)
+    # Next to the left edge, near the top and in the middle of the block
+    assert field.step(2 * 32 + 16, 3 * 32 + 16) == (-1, 0)
+    assert field.step(4 * 32 + 16, 2 * 32 + 16) == (0, -1)
+    for column in range(2, 8):
+        for row in range(2, 6):
+            x, y = column * 32 + 16, row * 32 + 16
+            for _ in range(4):
+                step = field.step(x, y)
+                assert step is not None
+                if not field.blocked[field.cell_at(x, y)]:
+                    break
+                x, y = x + step[0] * 32, y + step[1] * 32
+            assert not field.blocked[field.cell_at(x, y)]
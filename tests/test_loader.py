@@ -0,0 +1,39 @@
+import time
+
+from engine.assets import AssetManager
+from engine.loader import AssetLoader
+
+
+def poll_until_idle(loader, timeout=5):
+    deadline = time.monotonic() + timeout
+    while loader.poll() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+# A call queued once the critical batch is done and the workers have shut
+# down still runs, and its done callback gets the result
+def test_call_after_critical_batch_runs():
+    loader = AssetLoader(AssetManager())
+    results = []
+    loader.call(lambda: "critical", done=results.append, critical=True)
+    loader.start()
+    loader.wait()
+    assert loader.critical_ready()
+    poll_until_idle(loader)
+    assert loader.executor is None
+
+    loader.call(lambda value: value * 2, 21, done=results.append)
+    poll_until_idle(loader)
+    assert results == ["critical", 42]
+    assert loader.progress() == (2, 2)
+
+
+def test_calls_before_start_wait_for_it():
+    loader = AssetLoader(AssetManager())
+    results = []
+    loader.call(lambda: 1, done=results.append)
+    assert loader.poll() == 0
+    assert results == []
+    loader.start()
+    loader.wait(everything=True)
+    assert results == [1]
@@ -0,0 +1,41 @@
+import tracemalloc
+
+import pygame
+
+from engine.loop import InterpolatedSprites
+
+
+class Dot:
+    def __init__(self, x, y):
+        self.rect = pygame.Rect(x, y, 4, 4)
+
+
+def test_positions_between_ticks():
+    positions = InterpolatedSprites()
+    moving, late = Dot(0, 0), Dot(50, 50)
+    positions.save([moving])
+    moving.rect.x = 10
+    assert positions.position(moving, 0.5) == (5, 0)
+    # Not there at the save: drawn where it is
+    assert positions.position(late, 0.5) == (50, 50)
+    positions.save([late])
+    assert positions.position(moving, 0.5) == (10, 0)
+    positions.clear()
+    assert positions.position(late, 0.5) == (50, 50)
+
+
+# Once every sprite has its slot, saving allocates nothing per sprite
+def test_save_reuses_its_storage():
+    positions = InterpolatedSprites()
+    dots = [Dot(300 + index, 300 + index) for index in range(1000)]
+    positions.save(dots)
+    tracemalloc.start()
+    try:
+        for dot in dots:
+            dot.rect.move_ip(1, 1)
+        before = tracemalloc.get_traced_memory()[0]
+        positions.save(dots)
+        grown = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    assert grown < 1000
@@ -0,0 +1,57 @@
+from engine.scheduler import AIScheduler
+
+
+class Agent:
+    def __init__(self, interval):
+        self.interval = interval
+        self.ai_due = None
+        self.updates = []  # ticks of full updates
+        self.coasts = 0
+
+    def update(self, scheduler):
+        self.updates.append(scheduler.tick)
+
+    def coast(self):
+        self.coasts += 1
+
+
+def run(scheduler, agents, ticks):
+    for _ in range(ticks):
+        scheduler.run(agents, scheduler)
+
+
+# With a budget nothing fits in, near agents still update every tick and
+# every far one still gets a turn within max_wait ticks of coming due
+def test_tight_budget_updates_every_agent_in_time():
+    scheduler = AIScheduler(lambda agent, _: agent.interval, budget_ms=0, max_wait=20)
+    near = [Agent(1) for _ in range(50)]
+    far = [Agent(4) for _ in range(1000)] + [Agent(8) for _ in range(1000)]
+    run(scheduler, near + far, 200)
+
+    for agent in near:
+        assert agent.updates == list(range(1, 201))
+    for agent in far:
+        assert agent.updates
+        gaps = [later - earlier for earlier, later in zip([0] + agent.updates, agent.updates + [200])]
+        assert max(gaps) <= agent.interval + scheduler.max_wait
+
+
+def test_without_budget_agents_update_on_their_interval():
+    scheduler = AIScheduler(lambda agent, _: agent.interval)
+    agents = [Agent(4) for _ in range(8)]
+    run(scheduler, agents, 40)
+    for agent in agents:
+        assert [later - earlier for earlier, later in zip(agent.updates, agent.updates[1:])] == [4] * (len(agent.updates) - 1)
+    assert scheduler.deferred == 0
+    # Staggered, so the far ones do not all come due on one tick
+    assert len({agent.updates[0] for agent in agents}) == 4
+
+
+def test_reset_replays_the_same_schedule():
+    scheduler = AIScheduler(lambda agent, _: agent.interval)
+    first = [Agent(4) for _ in range(5)]
+    run(scheduler, first, 20)
+    scheduler.reset()
+    second = [Agent(4) for _ in range(5)]
+    run(scheduler, second, 20)
+    assert [agent.updates for agent in first] == [agent.updates for agent in second]
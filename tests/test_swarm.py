@@ -0,0 +1,47 @@
+import random
+
+import numpy as np
+import pygame
+
+from engine.collision import StaticCollisionIndex
+from engine.swarm import push_out, solid_counts
+
+
+# A 40x40 obstacle whose only solid pixels are a 10x10 block in the middle
+def ring_obstacle():
+    mask = pygame.Mask((40, 40))
+    mask.draw(pygame.Mask((10, 10), fill=True), (15, 15))
+    return pygame.Rect(100, 100, 40, 40), mask
+
+
+def test_mask_obstacle_only_pushes_slimes_on_solid_pixels():
+    rect, mask = ring_obstacle()
+    # In the transparent corner, on the solid block, and clear of the rect
+    x = np.array([102, 118, 50], dtype=np.int64)
+    y = np.array([102, 112, 50], dtype=np.int64)
+    speed = np.full(3, 2, dtype=np.int64)
+    push_out(x, y, speed, 8, 8, [(rect, solid_counts(mask))])
+    # Out of the top, the nearest side
+    assert x.tolist() == [102, 118, 50]
+    assert y.tolist() == [102, 110, 50]
+
+    # A plain rect is solid all over; the corner slime leaves on the x axis
+    # where the overlaps tie
+    push_out(x, y, speed, 8, 8, [rect])
+    assert x.tolist() == [100, 118, 50]
+    assert y.tolist() == [102, 108, 50]
+
+
+# The swarm hits the same slimes as the sprite backend's collision index
+def test_mask_push_out_matches_collision_index():
+    rect, mask = ring_obstacle()
+    index = StaticCollisionIndex(32)
+    index.add("tree", rect, mask)
+    rng = random.Random(3)
+    boxes = [pygame.Rect(rng.randint(80, 150), rng.randint(80, 150), 8, 6) for _ in range(500)]
+    x = np.array([box.x for box in boxes], dtype=np.int64)
+    y = np.array([box.y for box in boxes], dtype=np.int64)
+    push_out(x, y, np.ones(len(boxes), dtype=np.int64), 8, 6, [(rect, solid_counts(mask))])
+    moved = ((x != [box.x for box in boxes]) | (y != [box.y for box in boxes])).tolist()
+    assert moved == [bool(index.colliding(box)) for box in boxes]
+    assert any(moved) and not all(moved)